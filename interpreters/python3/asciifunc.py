@@ -1,17 +1,23 @@
 import argparse
 from pathlib import Path
+import sys
 import os
 
-from tokenise import tokenise
-from interpreter import interpret
-from errors import Errors
+from interpreter import Interpreter, compile_program
+from streams import FLUSH_POLICIES, InputSource, OutputSink
+from profiler import Profiler
+from hooks import Hooks
+from batch import read_manifest, run_batch
+from quotas import Quota
+from optimise import OPTIMISE_LEVELS
+from errors import QuotaExceededError
 
 parser = argparse.ArgumentParser(description="Runs an asciifunc file.")
 
 parser.add_argument("--file", "-f",
                     dest="file",
                     help="Path to the file.",
-                    required=True,
+                    required=False,
                     default=None)
 
 parser.add_argument("--strict", "-s",
@@ -21,15 +27,179 @@ parser.add_argument("--strict", "-s",
                     required=False,
                     default=False)
 
+parser.add_argument("--output", "-o",
+                    dest="output",
+                    help="Write the output to this file instead of the console. With --compile, where the compiled program is written "
+                         "(default: the file with an .afc extension).",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--compile",
+                    dest="compile",
+                    help="Compile this file to a program that --file runs without reading the code again, instead of running it. "
+                         "With --strict, the file is checked as it is in strict mode.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--input",
+                    dest="input",
+                    help="Read the input from this file (`-` for stdin) without prompting, instead of asking for it.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--flush",
+                    dest="flush",
+                    choices=FLUSH_POLICIES,
+                    help="When output is written: every line, in blocks, or at the end (default: every line on a terminal, otherwise in blocks).",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--profile",
+                    dest="profile",
+                    action="store_true",
+                    help="Time every command and print a report of the slowest ones once the program ends.",
+                    required=False,
+                    default=False)
+
+parser.add_argument("--profile-json",
+                    dest="profile_json",
+                    help="Write the profile to this file as json (implies --profile).",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--profile-folded",
+                    dest="profile_folded",
+                    help="Write the profile to this file as folded stacks for flame graph tools (implies --profile).",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--batch",
+                    dest="batch",
+                    help="Run every program in this manifest instead of --file, and write each run's output and status as a line of json. "
+                         "The manifest is json (a list of `{\"file\", \"input\", \"name\"}`), or has a program and optionally its input file on each line.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--jobs", "-j",
+                    dest="jobs",
+                    type=int,
+                    help="How many processes --batch runs the programs in (default: one per cpu).",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--max-steps",
+                    dest="max_steps",
+                    type=int,
+                    help="Stop the program once it has run this many commands.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--timeout",
+                    dest="timeout",
+                    type=float,
+                    help="Stop the program once it has run for this many seconds.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--max-depth",
+                    dest="max_depth",
+                    type=int,
+                    help="Stop the program if it is ever this many calls deep.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("--max-string",
+                    dest="max_string",
+                    type=int,
+                    help="Stop the program if its strings ever hold more than this many characters in total.",
+                    required=False,
+                    default=None)
+
+parser.add_argument("-O",
+                    dest="optimise",
+                    type=int,
+                    choices=OPTIMISE_LEVELS,
+                    help="How much the program is optimised before it runs: -O0 runs the commands as they were written, -O1 (the default) "
+                         "merges common runs of commands, folds constants and removes commands that do nothing.",
+                    required=False,
+                    default=1)
+
+parser.add_argument("--no-intrinsics",
+                    dest="intrinsics",
+                    action="store_false",
+                    help="Always run the functions of the std library as they are written, instead of in python when it gives "
+                         "the same result.",
+                    default=True)
+
 args = parser.parse_args()
 
+# what the program exits with when it is stopped by one of the limits above
+QUOTA_EXIT = 3
+
+quota = None
+
+if(any(limit is not None for limit in (args.max_steps, args.timeout, args.max_depth, args.max_string))):
+    quota = Quota(args.max_steps, args.timeout, args.max_depth, args.max_string)
+
+if(args.compile is not None):
+    if(not Path(args.compile).exists()):
+        raise ValueError("File does not exist!")
+
+    compile_program(Path(args.compile), Path(args.output) if args.output is not None else Path(args.compile).with_suffix(".afc"),
+                    args.strict)
+
+    sys.exit(0)
+
+if(args.batch is not None):
+    if(not Path(args.batch).exists()):
+        raise ValueError("Manifest does not exist!")
+
+    output = open(args.output, "w", encoding="utf-8") if args.output is not None else sys.stdout
+
+    try:
+        failed = run_batch(read_manifest(args.batch), args.jobs, args.strict, output, quota=quota, optimise=args.optimise,
+                           intrinsics=args.intrinsics)
+    finally:
+        output.flush()
+
+        if(output is not sys.stdout):
+            output.close()
+
+    sys.exit(1 if failed > 0 else 0)
+
 if(args.file is None or not Path(args.file).exists()):
     raise ValueError("File does not exist!")
 
-Errors.set_strict(args.strict)
-
 # cd to the current working directory
 os.chdir(os.getcwd())
 
-tok = tokenise(args.file)
-interpret(tok)
+output = OutputSink(args.output, args.flush)
+input_source = InputSource(sys.stdin if args.input == "-" else args.input)
+profiler = Profiler() if args.profile or args.profile_json or args.profile_folded else None
+hooks = Hooks()
+
+if(profiler is not None):
+    hooks.add(profiler)
+
+status = 0
+
+try:
+    interpreter = Interpreter(output=output, input=input_source, hooks=hooks, strict=args.strict, quota=quota,
+                              optimise=args.optimise, intrinsics=args.intrinsics)
+    interpreter.run(Path(args.file))
+except QuotaExceededError as e:
+    print(f"Stopped: {e}", file=sys.stderr)
+    status = QUOTA_EXIT
+finally:
+    output.close()
+
+    if(profiler is not None):
+        profiler.report()
+
+        if(args.profile_json is not None):
+            profiler.write_json(args.profile_json)
+
+        if(args.profile_folded is not None):
+            profiler.write_folded(args.profile_folded)
+
+sys.exit(status)
@@ -0,0 +1,179 @@
+from dataclasses import dataclass, asdict
+from typing import IO, Union
+from pathlib import Path
+import multiprocessing
+import json
+import time
+import sys
+import os
+import io
+
+from interpreter import Interpreter
+from streams import OutputSink
+from cache import Cache
+from quotas import Quota
+from errors import QuotaExceededError
+
+__all__ = ["Job", "Result", "read_manifest", "run_batch"]
+
+
+@dataclass
+class Job():
+    name: str
+    file: str
+    # the lines given to `>`, or the path of a file to read them from. a job never asks for input, once the lines run
+    # out `>` is skipped
+    input: Union[list, str, None] = None
+
+
+@dataclass
+class Result():
+    name: str
+    # 0 if the program ran to the end, 1 if it stopped because of an error, 2 if it went over its quota
+    status: int
+    output: str
+    error: Union[str, None]
+    # seconds, including loading the program the first time a worker runs it
+    time: float
+
+
+def read_manifest(manifest: Union[Path, str]) -> list:
+    # a manifest is either json (a list of file names or of objects with `file` and optionally `input` and `name`), or
+    # text with a program and optionally the file its input is read from on each line. lines starting with `#` are
+    # ignored. paths are relative to the folder the manifest is in
+    manifest = Path(manifest)
+    folder = manifest.parent
+    jobs = []
+
+    if(manifest.suffix == ".json"):
+        entries = json.loads(manifest.read_text(encoding="utf-8"))
+    else:
+        entries = []
+
+        for line in manifest.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+
+            if(line == "" or line.startswith("#")):
+                continue
+
+            file, _, input = line.partition(" ")
+            entries.append({"file": file, "input": input.strip() or None})
+
+    for entry in entries:
+        if(isinstance(entry, str)):
+            entry = {"file": entry}
+
+        file = str(folder / entry["file"])
+        input = entry.get("input")
+
+        if(isinstance(input, str)):
+            input = str(folder / input)
+
+        jobs.append(Job(entry.get("name", f"{entry['file']}#{len(jobs)}"), file, input))
+
+    return jobs
+
+
+# the state of a worker process, set up by `start_worker`
+STRICT = False
+CACHE = None
+QUOTA = None
+OPTIMISE = 1
+INTRINSICS = True
+
+# file -> its loaded interpreter, so a program that is run with many inputs is only loaded once per worker
+PROGRAMS = {}
+
+
+def start_worker(strict: bool, entries: dict, quota: Quota = None, optimise: int = 1, intrinsics: bool = True) -> None:
+    global STRICT, CACHE, QUOTA, OPTIMISE, INTRINSICS
+
+    STRICT = strict
+    QUOTA = quota
+    OPTIMISE = optimise
+    INTRINSICS = intrinsics
+
+    # the imports compiled by `warm_cache`. with `fork` the worker has them already, but they have to be passed along
+    # where processes are spawned
+    CACHE = Cache(memory=True)
+    CACHE.entries = entries
+
+
+def run_job(job: Job) -> Result:
+    output = io.StringIO()
+    start = time.perf_counter()
+
+    try:
+        interp = PROGRAMS.get(job.file)
+
+        if(interp is None):
+            interp = Interpreter(cache=CACHE, strict=STRICT, quota=QUOTA, optimise=OPTIMISE, intrinsics=INTRINSICS)
+            interp.load_source(Path(job.file))
+            PROGRAMS[job.file] = interp
+
+        interp.run(stdin=job.input if job.input is not None else [], stdout=OutputSink(output, "end"))
+    except QuotaExceededError as e:
+        return Result(job.name, 2, output.getvalue(), f"{e.__class__.__name__}: {e}", time.perf_counter() - start)
+    except Exception as e:
+        return Result(job.name, 1, output.getvalue(), f"{e.__class__.__name__}: {e}", time.perf_counter() - start)
+
+    return Result(job.name, 0, output.getvalue(), None, time.perf_counter() - start)
+
+
+def warm_cache(jobs: list, cache: Cache, strict: bool, optimise: int = 1) -> None:
+    # loads everything the programs import once, before the workers are started, so they dont all load the std library at
+    # the same time. loading a program loads its imports with it (see `Interpreter.preload`), into `cache` for workers
+    # that are spawned and into the modules of this process for ones that are forked. only imports of a literal path can
+    # be found like this, the rest are loaded by whichever worker needs them first (as are the ones in the functions of a
+    # compiled program, which arent read yet)
+    for file in dict.fromkeys(job.file for job in jobs):
+        try:
+            Interpreter(cache=cache, strict=strict, optimise=optimise).load_source(Path(file))
+        except Exception:
+            # reported when the job is run
+            continue
+
+
+def run_batch(jobs: list, processes: int = None, strict: bool = False, output: IO = None, report: IO = sys.stderr,
+              quota: Quota = None, optimise: int = 1, intrinsics: bool = True) -> int:
+    # runs every job, spread over `processes` worker processes (one per cpu by default), and writes one json object per
+    # job to `output` in the order of `jobs`. every run is held to `quota`, every program is optimised at the level
+    # `optimise`, and the std functions are run natively if `intrinsics` is set. returns the number of jobs that failed
+    if(output is None):
+        output = sys.stdout
+
+    processes = processes or os.cpu_count() or 1
+
+    cache = Cache(memory=True)
+    start = time.perf_counter()
+
+    warm_cache(jobs, cache, strict, optimise)
+
+    failed = 0
+    busy = 0
+
+    if(processes == 1):
+        start_worker(strict, cache.entries, quota, optimise, intrinsics)
+        results = map(run_job, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, start_worker, (strict, cache.entries, quota, optimise, intrinsics))
+        # big enough chunks that sending the jobs to the workers doesnt take longer than running them
+        results = pool.imap(run_job, jobs, chunksize=max(1, min(64, len(jobs) // (processes * 4))))
+
+    try:
+        for result in results:
+            failed += result.status != 0
+            busy += result.time
+
+            output.write(json.dumps(asdict(result)) + "\n")
+    finally:
+        if(pool is not None):
+            pool.terminate()
+
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(jobs)} runs ({failed} failed) in {elapsed:.2f}s on {processes} processes: "
+          f"{len(jobs) / elapsed if elapsed > 0 else 0:.1f} runs/s, {busy:.2f}s spent running programs", file=report)
+
+    return failed
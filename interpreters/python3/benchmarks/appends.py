@@ -0,0 +1,88 @@
+import argparse
+from pathlib import Path
+import time
+import sys
+import io
+
+# shows how the time `&` takes grows with the length of the string it appends to. every size should take about the same
+# time per append, if appending copied the whole string it would grow with the size
+INTERPRETER_FOLDER = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(INTERPRETER_FOLDER))
+
+from tokenise import tokenise
+from interpreter import Interpreter
+from streams import OutputSink
+
+SIZES = [100000, 200000, 500000, 1000000]
+
+# how many `&`s each time around the loop, so the loop itself is a small part of the time
+UNROLL = 10
+
+
+def make_program(appends: int) -> str:
+    # appends "ab" to a string `appends` times and outputs it. the piece is a variable so the appends arent folded into
+    # each other, and the program is run at -O0 so each one is its own `&`
+    loops = appends // UNROLL
+
+    return "\n".join([
+        "$(i, num) $(c, num) $(s, str) $(piece, str)",
+        ":(piece, \"ab\")",
+        "+(i, 1)",
+        *["&(s, piece)"] * UNROLL,
+        f"%({loops}, i, c)",
+        f"?(c, -{UNROLL + 2})",
+        "<(s)",
+    ])
+
+
+def run(appends: int, repeat: int) -> float:
+    interp = Interpreter(tokenise(make_program(appends)), optimise=0)
+    best = None
+
+    for _ in range(repeat):
+        output = io.StringIO()
+
+        start = time.process_time()
+        interp.run(stdout=OutputSink(output, "end"))
+        elapsed = time.process_time() - start
+
+        if(len(output.getvalue().strip()) != appends // UNROLL * UNROLL * 2):
+            raise RuntimeError(f"the string built with {appends} appends is the wrong length")
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Times building a string with 10^5 to 10^6 `&`s.")
+
+    parser.add_argument("sizes",
+                        nargs="*",
+                        type=int,
+                        help=f"How many appends to time (default: {', '.join(map(str, SIZES))}).")
+
+    parser.add_argument("--repeat", "-r",
+                        dest="repeat",
+                        type=int,
+                        help="How many times each size is run, the best time is kept.",
+                        default=3)
+
+    args = parser.parse_args()
+
+    results = [(size, run(size, args.repeat)) for size in args.sizes or SIZES]
+    first = results[0][1] / results[0][0]
+
+    print(f"{'appends':>10}{'time':>11}{'per append':>14}{'vs first':>10}")
+
+    for size, elapsed in results:
+        per = elapsed / size
+
+        print(f"{size:>10}{elapsed * 1000:>9.0f}ms{per * 1e9:>12.0f}ns{per / first:>10.2f}")
+
+    return 0
+
+
+if(__name__ == "__main__"):
+    sys.exit(main())
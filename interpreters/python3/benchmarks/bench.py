@@ -0,0 +1,348 @@
+import argparse
+from pathlib import Path
+import subprocess
+import json
+import time
+import tempfile
+import sys
+import os
+import io
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, peak memory just isnt reported there
+    resource = None
+
+# the interpreter is one folder up, and the programs are run from there so their import paths work the same way as they
+# do with `asciifunc.py`
+INTERPRETER_FOLDER = Path(__file__).resolve().parent.parent
+CORPUS_FOLDER = Path(__file__).resolve().parent / "corpus"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# name -> program and the lines of input it is given, paths are relative to the interpreter folder
+CORPUS = {
+    "99bottles": ("../../testcode/99bottles.ascf", []),
+    "brainf": ("../../testcode/brainf.ascf", [(CORPUS_FOLDER / "brainf.txt").read_text().strip()]),
+    "truthmachine": ("../../testcode/truthmachine.ascf", ["0"]),
+    "mult": ("benchmarks/corpus/mult.ascf", []),
+    "len": ("benchmarks/corpus/len.ascf", []),
+    "indexof": ("benchmarks/corpus/indexof.ascf", []),
+    "calls": ("benchmarks/corpus/calls.ascf", []),
+    "strings": ("benchmarks/corpus/strings.ascf", []),
+}
+
+# every program here is also run by `--check-optimise`, with the input it has in `CORPUS` or none
+TESTCODE_FOLDER = INTERPRETER_FOLDER.parent.parent / "testcode"
+
+# a program with nothing in it, to time starting the interpreter
+EMPTY = "startup"
+
+# how much slower than the baseline a benchmark can be before it is reported
+TOLERANCE = 0.10
+
+sys.path.insert(0, str(INTERPRETER_FOLDER))
+
+from interpreter import Interpreter, compile_program
+from optimise import OPTIMISE_LEVELS
+from streams import OutputSink
+from hooks import Hook, Hooks
+
+
+class StepCounter(Hook):
+    # counts every command that runs. only used in its own run, so it doesnt slow down the runs that are timed
+    def __init__(self) -> None:
+        self.steps = 0
+
+    def on_command(self, command, scope: str, index: int, elapsed: float) -> None:
+        self.steps += 1
+
+    def on_skip(self, command, scope: str, index: int, elapsed: float) -> None:
+        self.steps += 1
+
+
+class EmptyHook(Hook):
+    # listens to every event and does nothing, to see what having hooks costs by itself
+    def on_command(self, command, scope: str, index: int, elapsed: float) -> None:
+        pass
+
+    def on_skip(self, command, scope: str, index: int, elapsed: float) -> None:
+        pass
+
+    def on_call(self, name: str, command) -> None:
+        pass
+
+    def on_return(self, name: str, command) -> None:
+        pass
+
+    def on_import(self, file: Path) -> None:
+        pass
+
+    def on_input(self, text: str) -> None:
+        pass
+
+    def on_output(self, text: str) -> None:
+        pass
+
+
+def run_worker(name: str, steps: bool, hooked: bool, native: bool) -> dict:
+    # runs a single benchmark in this process, and reports how it went. the std functions are only run natively (see
+    # `intrinsics.py`) if `native` is set, otherwise they run the same commands the steps are counted in
+    os.chdir(INTERPRETER_FOLDER)
+
+    hooks = Hooks()
+    counter = StepCounter()
+
+    if(steps):
+        hooks.add(counter)
+    elif(hooked):
+        hooks.add(EmptyHook())
+
+    # cpu time rather than wall time, so other processes on the machine make less of a difference
+    start = time.process_time()
+
+    if(name != EMPTY):
+        file, lines = CORPUS[name]
+        # run from the file, so its imports are found from the folder it is in
+        Interpreter(hooks=hooks, intrinsics=native).run(Path(file), stdin=lines, stdout=OutputSink(io.StringIO(), "end"))
+
+    elapsed = time.process_time() - start
+
+    return {
+        "time": elapsed,
+        "steps": counter.steps if steps else None,
+        "peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+    }
+
+
+def spawn(name: str, steps: bool = False, hooked: bool = False, native: bool = False) -> dict:
+    # every run gets a new process, so nothing is left over from the last one (and the memory is its own)
+    command = ([sys.executable, __file__, "--worker", name] + (["--steps"] if steps else []) + (["--hooks"] if hooked else [])
+               + (["--native"] if native else []))
+
+    start = time.perf_counter()
+    done = subprocess.run(command, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+
+    if(done.returncode != 0):
+        raise RuntimeError(f"`{name}` failed:\n{done.stderr}")
+
+    result = json.loads(done.stdout)
+    result["wall"] = wall
+
+    return result
+
+
+def run_benchmark(name: str, repeat: int, hooked: bool) -> dict:
+    # hooks see every command, so the std functions are never run natively while the steps are counted. `time` is timed
+    # the same way so the steps per second mean something, and `native` is the time with them run natively, which has
+    # no steps to go with it
+    runs = [spawn(name, False, hooked) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run["time"])
+
+    native = [spawn(name, False, hooked, True) for _ in range(repeat)]
+
+    steps = spawn(name, True)["steps"] if name != EMPTY else 0
+
+    return {
+        "steps": steps,
+        "time": best["time"],
+        "native": min(run["time"] for run in native),
+        "wall": min(run["wall"] for run in runs),
+        "steps_per_sec": steps / best["time"] if best["time"] > 0 else 0,
+        "peak_kb": max((run["peak_kb"] or 0) for run in runs + native) or None,
+    }
+
+
+def run_level(file: str, lines: list, strict: bool, level: int, compiled: Path = None) -> str:
+    # the output of a program and how it ended. it is compiled to `compiled` and run from there if that is given
+    output = io.StringIO()
+
+    try:
+        if(compiled is not None):
+            compile_program(Path(file), compiled, strict)
+            file = compiled
+
+        Interpreter(strict=strict, optimise=level).run(Path(file), stdin=lines, stdout=OutputSink(output, "end"))
+        ended = "ok"
+    except Exception as e:
+        ended = f"{e.__class__.__name__}: {e}"
+
+    return f"{output.getvalue()}\n[{ended}]"
+
+
+def check_optimise() -> int:
+    # runs every program in the corpus and `testcode/` at every optimisation level, in normal and strict mode, both as it
+    # is written and compiled (see `bytecode.py`), and reports the ones whose output or error is not the same every time.
+    # a program with a `.expected` file next to it has to write what is in it as well, and end without an error. returns
+    # the number of programs that failed
+    os.chdir(INTERPRETER_FOLDER)
+
+    programs = dict(CORPUS)
+    known = {str((INTERPRETER_FOLDER / file).resolve()) for file, _ in CORPUS.values()}
+
+    for file in sorted(TESTCODE_FOLDER.glob("*.ascf")):
+        if(str(file.resolve()) not in known):
+            programs[file.stem] = (str(file), [])
+
+    failed = 0
+
+    with tempfile.TemporaryDirectory() as folder:
+        for name, (file, lines) in programs.items():
+            for strict in (False, True):
+                runs = [run_level(file, lines, strict, level) for level in OPTIMISE_LEVELS]
+                runs += [run_level(file, lines, strict, level, Path(folder) / f"{name}.afc") for level in OPTIMISE_LEVELS]
+                label = f"{name}{' (strict)' if strict else ''}"
+
+                expected = Path(file).with_suffix(".expected")
+
+                if(expected.exists()):
+                    runs.append(f"{expected.read_text(encoding='utf-8')}\n[ok]")
+
+                if(all(run == runs[0] for run in runs)):
+                    print(f"ok    {label}")
+                else:
+                    print(f"DIFF  {label}")
+                    failed += 1
+
+    return failed
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # returns a description of every regression. a different number of steps means the program ran differently, so
+    # the times cant be compared
+    regressions = []
+
+    for name, result in results.items():
+        if(name not in baseline):
+            continue
+
+        old = baseline[name]
+
+        if(name != EMPTY and result["steps"] != old["steps"]):
+            regressions.append(f"{name}: ran {result['steps']} steps instead of {old['steps']}")
+            continue
+
+        for key in (["wall"] if name == EMPTY else ["time", "native"]):
+            if(key in old and result[key] > old[key] * (1 + tolerance)):
+                regressions.append(f"{name}: {result[key] * 1000:.1f}ms{' native' if key == 'native' else ''}, was "
+                                   f"{old[key] * 1000:.1f}ms ({result[key] / old[key] - 1:+.0%})")
+
+    return regressions
+
+
+def print_results(results: dict, baseline: dict) -> None:
+    print(f"{'benchmark':<14}{'steps':>10}{'steps/s':>12}{'time':>11}{'native':>11}{'wall':>11}{'peak':>10}{'vs base':>10}")
+
+    for name, result in results.items():
+        change = ""
+
+        if(name in baseline):
+            key = "wall" if name == EMPTY else "time"
+            change = f"{result[key] / baseline[name][key] - 1:+.0%}"
+
+        peak = f"{result['peak_kb'] / 1024:.1f}MB" if result["peak_kb"] is not None else "-"
+
+        print(f"{name:<14}{result['steps']:>10}{result['steps_per_sec']:>12,.0f}{result['time'] * 1000:>9.1f}ms"
+              f"{result['native'] * 1000:>9.1f}ms{result['wall'] * 1000:>9.1f}ms{peak:>10}{change:>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the python interpreter.")
+
+    parser.add_argument("names",
+                        nargs="*",
+                        help=f"Benchmarks to run (default: all). One of: {', '.join(CORPUS)}.")
+
+    parser.add_argument("--repeat", "-r",
+                        dest="repeat",
+                        type=int,
+                        help="How many times each benchmark is run, the best time is kept.",
+                        default=5)
+
+    parser.add_argument("--baseline", "-b",
+                        dest="baseline",
+                        help="Baseline to compare against.",
+                        default=str(BASELINE))
+
+    parser.add_argument("--save",
+                        dest="save",
+                        action="store_true",
+                        help="Save the results as the new baseline.",
+                        default=False)
+
+    parser.add_argument("--tolerance", "-t",
+                        dest="tolerance",
+                        type=float,
+                        help="How much slower than the baseline a benchmark can be (0.1 is 10%%).",
+                        default=TOLERANCE)
+
+    parser.add_argument("--json",
+                        dest="json",
+                        help="Also write the results to this file.",
+                        default=None)
+
+    parser.add_argument("--hooks",
+                        dest="hooks",
+                        action="store_true",
+                        help="Run with a hook that listens to every event and does nothing, to measure what hooks cost.",
+                        default=False)
+
+    parser.add_argument("--check-optimise",
+                        dest="check_optimise",
+                        action="store_true",
+                        help="Instead of timing anything, check that every program in the corpus and testcode/ gives the same "
+                             "output at every optimisation level, and compiled.",
+                        default=False)
+
+    parser.add_argument("--worker", dest="worker", help=argparse.SUPPRESS, default=None)
+    parser.add_argument("--steps", dest="steps", action="store_true", help=argparse.SUPPRESS, default=False)
+    parser.add_argument("--native", dest="native", action="store_true", help=argparse.SUPPRESS, default=False)
+
+    args = parser.parse_args()
+
+    if(args.worker is not None):
+        print(json.dumps(run_worker(args.worker, args.steps, args.hooks, args.native)))
+        return 0
+
+    if(args.check_optimise):
+        return 1 if check_optimise() > 0 else 0
+
+    for name in args.names:
+        if(name not in CORPUS):
+            parser.error(f"unknown benchmark `{name}`")
+
+    results = {EMPTY: run_benchmark(EMPTY, args.repeat, args.hooks)}
+
+    for name in args.names or CORPUS:
+        results[name] = run_benchmark(name, args.repeat, args.hooks)
+
+    baseline_file = Path(args.baseline)
+    baseline = json.loads(baseline_file.read_text()) if baseline_file.exists() and not args.save else {}
+
+    print_results(results, baseline)
+
+    if(args.json is not None):
+        Path(args.json).write_text(json.dumps(results, indent=4) + "\n")
+
+    if(args.save):
+        baseline_file.write_text(json.dumps(results, indent=4) + "\n")
+        print(f"\nSaved the baseline to {baseline_file}")
+
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    if(len(regressions) > 0):
+        print("\nRegressions:")
+
+        for regression in regressions:
+            print(f"  {regression}")
+
+        return 1
+
+    return 0
+
+
+if(__name__ == "__main__"):
+    sys.exit(main())
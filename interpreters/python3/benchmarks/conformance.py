@@ -0,0 +1,178 @@
+import argparse
+from itertools import product
+from pathlib import Path
+import tempfile
+import sys
+import io
+
+# checks that every std function gives exactly the same result when it is run natively (see `intrinsics.py`) as when it
+# is run as it was written, for arguments of every type, every type of variable the result is stored in, and callers
+# that have variables with the same names as the ones the std functions declare
+INTERPRETER_FOLDER = Path(__file__).resolve().parent.parent
+STD = INTERPRETER_FOLDER.parent.parent / "std-asciifunc.ascf"
+
+sys.path.insert(0, str(INTERPRETER_FOLDER))
+
+from tokenise import tokenise
+from interpreter import Interpreter
+from intrinsics import INTRINSICS, NOT_NATIVE
+from streams import OutputSink
+from quotas import Quota
+from cache import Cache
+from errors import QuotaExceededError
+
+# a std function that doesnt end within this many commands is taken to never end (i.e. `mult` with 0), and isnt checked
+STEPS = 50000
+
+NUMBERS = ["0", "1", "-1", "2", "3", "-3", "7", "0.4", "0.5", "-0.5", "1.5", "2.6", "-2.5", "100"]
+STRINGS = ["\"\"", "\"a\"", "\"abc\"", "\"abcabc\"", "\"bc\"", "\"c\"", "\"hello world\"", "\"true\"", "\"TRUE\"",
+           "\"truE \""]
+BOOLS = ["true", "false"]
+
+VALUES = NUMBERS + STRINGS + BOOLS
+
+# smaller sets for the functions with more parameters
+FEW_NUMBERS = ["0", "1", "-1", "2", "-3", "0.5", "2.6", "-2.5"]
+INDEXES = ["0", "1", "2", "-1", "5", "1.5", "\"1\"", "true"]
+FEW_STRINGS = ["\"abcabc\"", "\"bc\"", "1", "true"]
+FEW = FEW_NUMBERS + ["\"\"", "\"abc\"", "\"TRUE\""] + BOOLS
+
+ARGUMENTS = {
+    "not": [VALUES],
+    "and": [FEW, FEW],
+    "or": [FEW, FEW],
+    "gt": [FEW, FEW],
+    "lt": [FEW, FEW],
+    "eq": [FEW, FEW],
+    "num_to_bool": [VALUES],
+    "str_to_bool": [VALUES],
+    "is_dec": [VALUES],
+    "len": [VALUES],
+    "indexof": [FEW_STRINGS, FEW_STRINGS + ["\"\"", "\"c\""], INDEXES],
+    "insert": [FEW_STRINGS, FEW_STRINGS, INDEXES + ["-3", "10"]],
+    "char_at": [STRINGS, INDEXES + ["-3", "10", "2.0"]],
+    "abs": [VALUES],
+    "trunc": [VALUES],
+    "round": [VALUES],
+    "mult": [FEW, FEW],
+    "pow": [FEW_NUMBERS, ["0", "1", "2", "3", "5", "-1", "0.5"]],
+}
+
+RESULTS = ["num", "str", "bool"]
+
+
+def contexts(name: str) -> list:
+    # code run before the call, and what it outputs after: nothing, or a global with one of the names the function
+    # declares (so it cant be run natively, and has to change that variable like the std function would)
+    names = sorted(INTRINSICS[name].names)
+
+    return [
+        ("", ""),
+        (f"$({names[0]}, num) =({names[0]}, 5)", f"<({names[0]})"),
+        (f"$({names[-1]}, str) :({names[-1]}, \"x\")", f"<({names[-1]})"),
+    ]
+
+
+class CountingInterpreter(Interpreter):
+    # counts the calls that were run natively
+    natives = 0
+
+    def call_intrinsic(self, intrinsic, values: list):
+        value = super().call_intrinsic(intrinsic, values)
+
+        if(value is not NOT_NATIVE):
+            CountingInterpreter.natives += 1
+
+        return value
+
+
+def make_program(name: str, arguments: tuple, result: str, context: tuple) -> str:
+    setup, show = context
+
+    return "\n".join([
+        f"~(\"{STD.as_posix()}\")",
+        setup,
+        f"$(r, {result})",
+        f"|({name}, {', '.join(arguments)}, r)",
+        "<(r)",
+        show,
+    ])
+
+
+def run(program: str, strict: bool, intrinsics: bool, cache: Cache) -> str:
+    # the output of the program and how it ended
+    output = io.StringIO()
+    quota = None if intrinsics else Quota(steps=STEPS)
+
+    try:
+        interp = CountingInterpreter(tokenise(program), cache=cache, strict=strict, quota=quota, intrinsics=intrinsics)
+        interp.run(stdout=OutputSink(output, "end"))
+        ended = "ok"
+    except QuotaExceededError:
+        return None
+    except Exception as e:
+        ended = f"{e.__class__.__name__}: {e}"
+
+    return f"{output.getvalue()}[{ended}]"
+
+
+def check(name: str, cache: Cache, verbose: bool) -> tuple:
+    # returns (cases, cases run natively, cases that never end, cases that differ)
+    cases = natives = endless = failed = 0
+
+    for arguments, result, context, strict in product(product(*ARGUMENTS[name]), RESULTS, contexts(name), (False, True)):
+        program = make_program(name, arguments, result, context)
+        expected = run(program, strict, False, cache)
+        cases += 1
+
+        if(expected is None):
+            endless += 1
+            continue
+
+        before = CountingInterpreter.natives
+        actual = run(program, strict, True, cache)
+        natives += CountingInterpreter.natives > before
+
+        if(actual != expected):
+            failed += 1
+
+            if(verbose):
+                print(f"  {name}({', '.join(arguments)}) -> {result}{' strict' if strict else ''} {context[0]!r}:\n"
+                      f"    written: {expected!r}\n    native:  {actual!r}")
+
+    return cases, natives, endless, failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Checks that the native std functions give the same results as the std library.")
+
+    parser.add_argument("names",
+                        nargs="*",
+                        help=f"Functions to check (default: all). One of: {', '.join(ARGUMENTS)}.")
+
+    parser.add_argument("--verbose", "-v",
+                        dest="verbose",
+                        action="store_true",
+                        help="Show every case that differs.",
+                        default=False)
+
+    args = parser.parse_args()
+
+    failed = 0
+
+    with tempfile.TemporaryDirectory() as folder:
+        cache = Cache(folder)
+
+        print(f"{'function':<14}{'cases':>7}{'native':>8}{'endless':>9}{'differ':>8}")
+
+        for name in args.names or ARGUMENTS:
+            cases, natives, endless, differ = check(name, cache, args.verbose)
+            failed += differ
+
+            print(f"{name:<14}{cases:>7}{natives:>8}{endless:>9}{differ:>8}")
+
+    return 1 if failed > 0 else 0
+
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,322 @@
+from typing import Union
+from pathlib import Path
+import struct
+import mmap
+
+from constants import COMMANDS, SKIP, Types
+from extended import Bool
+from verify import POINTERS
+
+__all__ = ["CompiledProgram", "write_program", "is_compiled", "GLOBAL_SCOPE", "FORMAT_VERSION"]
+
+# the compiled form of a program, written by `asciifunc.py --compile` and run by `asciifunc.py -f` without tokenising
+# it. it is the program as it was verified (see `verify`) but not optimised, so it can be run at any level. everything
+# is little endian, and offsets are from the start of the file:
+#
+#   header     MAGIC, FORMAT_VERSION, flags (see `CLEAN`), then the number of strings, functions and scopes and the
+#              offsets of the string table, the functions, the scopes and the code
+#   strings    (offset from the end of the table, length) of every string, followed by them all encoded as utf-8. names
+#              of functions and variables, string literals and big ints are all stored once and referred to by index
+#   functions  the name of every function in the order they were declared, and the digest of the std function it is
+#              (all zeros if it isnt one, see `intrinsics.py`)
+#   scopes     the global scope (-1) and then every function: where its code starts (from the start of the code, or
+#              `NO_CODE`), how many commands it has and its variables. the variables are its parameters and then the
+#              names declared by `$` in the order they are written, each with how it was found (see `PARAMETER`), which
+#              is all `Interpreter.resolve` needs to give them their slots at any level
+#   code       every command is its name (index in `COMMANDS`), its op (`SKIP` if it can never run), how many arguments
+#              and targets it has, and its line and column, followed by its arguments and then its targets. an argument
+#              is its type, how its value is stored (see `STRING_VALUE`), the index of its sign in `SIGNS` and 8 bytes of
+#              value. a target is the absolute index a pointer goes to, or -1 if it goes nowhere
+#
+# loading a compiled program only reads the header and the tables, the code of a scope is only read when it first runs
+MAGIC = b"ASCF"
+
+# bump it whenever the layout changes, or `COMMANDS` or the types are changed
+FORMAT_VERSION = 2
+
+# the flag set when no problems were found in the program, so it runs the same in strict mode
+CLEAN = 1
+
+HEADER = struct.Struct("<4sHHIIIIIII")
+STRING = struct.Struct("<II")
+FUNCTION = struct.Struct("<I16s")
+SCOPE = struct.Struct("<iIII")
+VARIABLE = struct.Struct("<IB")
+COMMAND = struct.Struct("<BBIIII")
+ARGUMENT = struct.Struct("<HBB8s")
+TARGET = struct.Struct("<i")
+
+INT = struct.Struct("<q")
+FLOAT = struct.Struct("<d")
+STRING_ID = struct.Struct("<I4x")
+
+# how a variable of a scope was found: a parameter, declared by a `$`, or declared by a `$` that can never run (which
+# is left out when the program is optimised)
+PARAMETER = 0
+DECLARED = 1
+DEAD = 2
+
+# how the value of an argument is stored
+STRING_VALUE = 0
+INT_VALUE = 1
+FLOAT_VALUE = 2
+BOOL_VALUE = 3
+# an int that doesnt fit in 8 bytes, stored as a string
+BIG_VALUE = 4
+
+SIGNS = ["", "+", "-"]
+
+# the key of the global scope, functions are keyed by their index
+GLOBAL_SCOPE = -1
+
+# the code offset of a scope that has variables but no commands
+NO_CODE = 0xFFFFFFFF
+
+NO_DIGEST = bytes(16)
+
+
+def is_compiled(source) -> bool:
+    # only files can be compiled, a string is the code itself
+    if(not isinstance(source, Path)):
+        return False
+
+    try:
+        with open(source, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class StringPool():
+    def __init__(self) -> None:
+        self.ids = {}
+
+    def add(self, text: str) -> int:
+        return self.ids.setdefault(text, len(self.ids))
+
+
+def pack_value(value, strings: StringPool) -> tuple:
+    # (how it is stored, the 8 bytes). `Bool` is an `int` as well, so it has to come first
+    if(isinstance(value, Bool)):
+        return BOOL_VALUE, INT.pack(1 if value else 0)
+    elif(isinstance(value, str)):
+        return STRING_VALUE, STRING_ID.pack(strings.add(value))
+    elif(isinstance(value, float)):
+        return FLOAT_VALUE, FLOAT.pack(value)
+    elif(INT.size * 8 > value.bit_length()):
+        return INT_VALUE, INT.pack(value)
+
+    return BIG_VALUE, STRING_ID.pack(strings.add(str(value)))
+
+
+def get_variables(parameters: dict, commands: list) -> list:
+    # (name, how it was found) of every variable of a scope, see `PARAMETER`
+    variables = [(name, PARAMETER) for name in sorted(parameters, key=parameters.get)]
+
+    for command in commands:
+        if(command.name == "$" and len(command.arguments) > 0 and Types.eq(command.arguments[0].type, Types.VARIABLE)):
+            variables.append((command.arguments[0].value, DEAD if command.op == SKIP else DECLARED))
+
+    return variables
+
+
+def is_clean(command) -> bool:
+    # whether strict mode would have let the command through: it can run, and every pointer it was given goes somewhere
+    if(command.op == SKIP):
+        return False
+
+    return all(target is not None for num, target in zip(POINTERS.get(command.name, []), command.targets or [])
+               if num < len(command.arguments))
+
+
+def write_program(file: Path, functions: list, digests: dict, parameters: dict, commands: dict) -> None:
+    # `functions` are the names of the functions by index, `digests` the digest of the std function (as hex) for the
+    # ones that are one, `parameters` the names of the parameters of each function and `commands` the verified
+    # commands of each scope, all keyed by the function index or `GLOBAL_SCOPE`
+    strings = StringPool()
+    code = bytearray()
+    scopes = bytearray()
+    clean = True
+
+    for scope in [GLOBAL_SCOPE, *range(len(functions))]:
+        scope_commands = commands.get(scope)
+
+        if(scope_commands is None):
+            offset = NO_CODE
+            scope_commands = []
+        else:
+            offset = len(code)
+
+        variables = get_variables(parameters.get(scope, {}), scope_commands)
+        scopes += SCOPE.pack(scope, offset, len(scope_commands), len(variables))
+
+        for name, found in variables:
+            scopes += VARIABLE.pack(strings.add(name), found)
+
+        for command in scope_commands:
+            targets = command.targets or []
+
+            if(not is_clean(command)):
+                clean = False
+
+            code += COMMAND.pack(COMMANDS.index(command.name), command.op, len(command.arguments), len(targets),
+                                 command.line, command.column)
+
+            for arg in command.arguments:
+                kind, value = pack_value(arg.value, strings)
+                code += ARGUMENT.pack(arg.type, kind, SIGNS.index(arg.sign), value)
+
+            for target in targets:
+                code += TARGET.pack(target if target is not None else -1)
+
+    table = bytearray()
+
+    for index, name in enumerate(functions):
+        digest = digests.get(index)
+        table += FUNCTION.pack(strings.add(name), bytes.fromhex(digest) if digest is not None else NO_DIGEST)
+
+    encoded = [text.encode("utf-8", "surrogatepass") for text in strings.ids]
+    pool = bytearray()
+    blob_at = 0
+
+    for text in encoded:
+        pool += STRING.pack(blob_at, len(text))
+        blob_at += len(text)
+
+    pool += b"".join(encoded)
+
+    strings_at = HEADER.size
+    functions_at = strings_at + len(pool)
+    scopes_at = functions_at + len(table)
+    code_at = scopes_at + len(scopes)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, CLEAN if clean else 0, len(encoded), len(functions), len(functions) + 1,
+                         strings_at, functions_at, scopes_at, code_at)
+
+    file.write_bytes(header + pool + table + scopes + code)
+
+
+class CompiledProgram():
+    # a program written by `write_program`. the file is mapped into memory rather than read, and strings and commands
+    # are only decoded when they are asked for
+    def __init__(self, file: Path) -> None:
+        with open(file, "rb") as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # empty, or mmap isnt supported for this file
+                self.data = f.read()
+
+        data = self.data
+
+        if(len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC):
+            raise ValueError(f"{file.name} is not a compiled program.")
+
+        (_, version, flags, strings, functions, scopes, self.strings_at, functions_at, scopes_at,
+         self.code_at) = HEADER.unpack_from(data, 0)
+
+        if(version != FORMAT_VERSION):
+            raise ValueError(f"{file.name} was compiled to version {version} of the format, this interpreter runs version "
+                             f"{FORMAT_VERSION}. Compile it again.")
+
+        self.clean = bool(flags & CLEAN)
+
+        self.blob_at = self.strings_at + strings * STRING.size
+        self.texts = [None] * strings
+
+        # names of the functions by index, and the digests of the ones that are std functions
+        self.functions = []
+        self.digests = {}
+
+        for index in range(functions):
+            name, digest = FUNCTION.unpack_from(data, functions_at + index * FUNCTION.size)
+            self.functions.append(self.string(name))
+
+            if(digest != NO_DIGEST):
+                self.digests[index] = digest.hex()
+
+        # scope -> [(variable name, how it was found)], and scope -> (where its code starts, how many commands it has)
+        self.variables = {}
+        self.scopes = {}
+
+        pos = scopes_at
+
+        for _ in range(scopes):
+            scope, offset, count, variables = SCOPE.unpack_from(data, pos)
+            pos += SCOPE.size
+
+            self.variables[scope] = [(self.string(name), found) for name, found in
+                                     VARIABLE.iter_unpack(data[pos:pos + variables * VARIABLE.size])]
+            pos += variables * VARIABLE.size
+
+            if(offset != NO_CODE):
+                self.scopes[scope] = (self.code_at + offset, count)
+
+    def close(self) -> None:
+        # nothing can be read after this, the strings that were already decoded are kept
+        if(isinstance(self.data, mmap.mmap)):
+            self.data.close()
+
+    def __enter__(self) -> "CompiledProgram":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get_symbols(self, scope: int, level: int) -> dict:
+        # variable name -> slot, as `Interpreter.resolve` would give them to a scope optimised at `level`
+        names = {}
+
+        for name, found in self.variables[scope]:
+            if(found != DEAD or level == 0):
+                names.setdefault(name, len(names))
+
+        return names
+
+    def string(self, index: int) -> str:
+        text = self.texts[index]
+
+        if(text is None):
+            start, length = STRING.unpack_from(self.data, self.strings_at + index * STRING.size)
+            start += self.blob_at
+
+            text = self.texts[index] = str(self.data[start:start + length], "utf-8", "surrogatepass")
+
+        return text
+
+    def unpack_value(self, kind: int, value: bytes) -> Union[str, int, float]:
+        if(kind == STRING_VALUE):
+            return self.string(STRING_ID.unpack(value)[0])
+        elif(kind == INT_VALUE):
+            return INT.unpack(value)[0]
+        elif(kind == FLOAT_VALUE):
+            return FLOAT.unpack(value)[0]
+        elif(kind == BOOL_VALUE):
+            return Bool("true" if INT.unpack(value)[0] else "false")
+
+        return int(self.string(STRING_ID.unpack(value)[0]))
+
+    def read_scope(self, scope: int) -> list:
+        # the commands of a scope as (name, op, line, column, [(type, value, sign)], targets)
+        pos, count = self.scopes[scope]
+        data = self.data
+        commands = []
+
+        for _ in range(count):
+            name, op, arguments, targets, line, column = COMMAND.unpack_from(data, pos)
+            pos += COMMAND.size
+
+            end = pos + arguments * ARGUMENT.size
+            args = [(type, self.unpack_value(kind, value), SIGNS[sign])
+                    for type, kind, sign, value in ARGUMENT.iter_unpack(data[pos:end])]
+            pos = end
+
+            if(targets > 0):
+                jumps = [target if target >= 0 else None for (target,) in TARGET.iter_unpack(data[pos:pos + targets * TARGET.size])]
+                pos += targets * TARGET.size
+            else:
+                jumps = None
+
+            commands.append((COMMANDS[name], op, line, column, args, jumps))
+
+        return commands
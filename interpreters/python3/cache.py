@@ -0,0 +1,171 @@
+from typing import Union
+from pathlib import Path
+import tempfile
+import hashlib
+import pickle
+import gzip
+import sys
+import os
+
+from constants import VERSION
+
+__all__ = ["Cache"]
+
+CACHE_FOLDER = Path("./.afcache")
+
+# the least recently used entries are removed once there are more than this many
+CACHE_SIZE = 64
+
+
+def hash_file(file: Path) -> str:
+    return hashlib.md5(file.read_bytes()).hexdigest()
+
+
+class Cache():
+    # compiled imports, kept in `folder` between runs. nothing is cached if `folder` is `None`. the folder is only
+    # created once something is saved in it. with `memory` the entries that have been used are also kept in memory, for
+    # processes that import the same files over and over (see `batch.py`)
+    def __init__(self, folder: Union[Path, str, None] = CACHE_FOLDER, size: int = CACHE_SIZE, memory: bool = False) -> None:
+        self.folder = Path(folder) if folder is not None else None
+        self.size = size
+        self.memory = memory
+
+        # path of the entry -> (mtime, size, pickled data) of the file it was made from. the data is kept pickled since
+        # every import needs its own copy of it
+        self.entries = {}
+
+    def remember(self, path: Path, stat: os.stat_result, data) -> None:
+        if(self.memory):
+            self.entries[path] = (stat.st_mtime_ns, stat.st_size, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+    def get_path(self, file: Path, strict: bool, level: int = 0) -> Path:
+        # the same file name can be imported from different folders, and the compiled commands are only valid for the
+        # interpreter that made them, so both are part of the key. commands are also verified differently in strict mode,
+        # and optimised differently at each level
+        key = f"{file}|{VERSION}|{sys.version_info[0]}.{sys.version_info[1]}|{strict}|{level}"
+        digest = hashlib.md5(key.encode()).hexdigest()[:16]
+
+        return self.folder / f"{file.stem}-{digest}.afc"
+
+    def write_entry(self, path: Path, entry: dict) -> None:
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first and then move it into place, so other processes using the same cache folder
+        # never see a half written entry
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix=f".{path.stem}-", suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wb") as f:
+                pickle.dump(entry, f)
+
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        entries = []
+
+        for path in self.folder.glob("*.afc"):
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except OSError:
+                # removed by another process
+                continue
+
+        if(len(entries) <= self.size):
+            return
+
+        entries.sort()
+
+        for _, path in entries[:len(entries) - self.size]:
+            try:
+                path.unlink()
+            except OSError:
+                continue
+
+    def load(self, file: Path, strict: bool, level: int = 0):
+        # returns what was saved for `file`, or `None` if there is nothing cached or the file has changed since
+        if(self.folder is None):
+            return None
+
+        file = Path(file).resolve()
+        path = self.get_path(file, strict, level)
+
+        if(path in self.entries):
+            try:
+                stat = file.stat()
+            except OSError:
+                return None
+
+            mtime, size, data = self.entries[path]
+
+            if(mtime == stat.st_mtime_ns and size == stat.st_size):
+                return pickle.loads(data)
+
+        try:
+            with gzip.open(path, "rb") as f:
+                entry = pickle.load(f)
+
+            stat = file.stat()
+        except Exception:
+            # missing or unreadable (i.e. written by a different python version), so just compile it again
+            return None
+
+        if(entry.get("version") != VERSION or entry.get("source") != str(file)):
+            return None
+
+        # checking the size and modification time is cheap, only hash the file if they are different
+        if(entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size):
+            if(hash_file(file) != entry["md5"]):
+                return None
+
+            # the contents are the same (the file was just touched), so store the new stat to keep the next check cheap
+            entry["mtime"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+
+            self.write_entry(path, entry)
+        else:
+            # mark as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+        self.remember(path, stat, entry["data"])
+
+        return entry["data"]
+
+    def save(self, file: Path, stat: os.stat_result, data, strict: bool, level: int = 0) -> None:
+        # `stat` should be taken before the file is read, so that if the file changes while it is being compiled the
+        # entry is seen as out of date
+        if(self.folder is None):
+            return
+
+        file = Path(file).resolve()
+
+        try:
+            md5 = hash_file(file)
+            after = file.stat()
+        except OSError:
+            return
+
+        if(after.st_mtime_ns != stat.st_mtime_ns or after.st_size != stat.st_size):
+            # changed while it was being compiled, so `data` might not match `md5`
+            return
+
+        path = self.get_path(file, strict, level)
+
+        self.remember(path, stat, data)
+        self.write_entry(path, {
+            "version": VERSION,
+            "source": str(file),
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "md5": md5,
+            "data": data,
+        })
+
+        self.evict()
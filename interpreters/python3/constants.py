@@ -1,8 +1,24 @@
-from extended import Bool, SignedNum
+from extended import Bool
+
+# part of the import cache key, bump it whenever the compiled form of a program changes
+VERSION = "0.18.0"
 
 COMMANDS = ["~", "$", "+", "=", "%", ":", "&", "!", ".",
             "@", "\"", "1", "#", "?", "/", "\\", "|", ">", "<"]
 
+# commands are lowered to these when the program is loaded so the interpreter can dispatch on an index
+OPCODES = {name: op for op, name in enumerate(COMMANDS)}
+
+# commands that can never run (i.e. they have the wrong number of arguments) are lowered to this when the program is
+# verified, so they are skipped without being looked at
+SKIP = len(COMMANDS)
+
+# commands made by `optimise` out of runs of other commands, see `Interpreter.exec_block`, `Interpreter.exec_build` and
+# `Interpreter.exec_compare_branch`
+BLOCK = SKIP + 1
+BUILD = SKIP + 2
+COMPARE = SKIP + 3
+
 # min | max
 ARG_NUM = {
     "~": [1, 1],
@@ -28,7 +44,7 @@ ARG_NUM = {
     "\\": [0, 1],
     "|": [1, None],
 
-    ">": [1, 1],
+    ">": [2, 2],
     "<": [1, 1],
 }
 
@@ -39,7 +55,8 @@ class Types:
     # LT = literal - a literal string is an actual string wrapped in quotes
     # a literal number is just a number
     # a literal bool is `true` / `false`
-    LT_NUMBER = 0
+    # (non-zero, otherwise `eq` could never match it)
+    LT_NUMBER = 256
     LT_NUMBER_P = 1  # P and N -> positive / negative
     LT_NUMBER_N = 2
     LT_STRING = 4
@@ -53,7 +70,8 @@ class Types:
 
     VARIABLE = 128
 
-    ANY_NUMBER = LT_NUMBER | LT_NUMBER_P | LT_NUMBER_N | KW_NUMBER
+    ANY_LT_NUMBER = LT_NUMBER | LT_NUMBER_P | LT_NUMBER_N
+    ANY_NUMBER = ANY_LT_NUMBER | KW_NUMBER
     ANY_STRING = LT_STRING | KW_STRING
 
     ANY_VAR = KW_NUMBER | KW_STRING | KW_BOOL
@@ -85,7 +103,7 @@ class Types:
             Types.ANY_STRING: "ANY_STRING",
             Types.ANY_VAR: "ANY_VAR",
             Types.ANY: "ANY",
-        }[t]
+        }.get(t, str(t))
 
     def eq(t1: int, t2: int) -> bool:
         if(isinstance(t1, str) or isinstance(t2, str)):
@@ -117,12 +135,20 @@ ARG_TYPES = {
     "\\": [Types.ANY_VAR],
     "|": [Types.VARIABLE, Types.ANY_VAR],
 
-    ">": [Types.ANY_VAR],
+    ">": [Types.ANY_VAR, Types.ANY_VAR],
     "<": [Types.ANY_VAR],
 }
 
+# the variable type each kind of runtime value can be stored in
+VALUE_TYPES = {
+    str: Types.KW_STRING,
+    int: Types.KW_NUMBER,
+    float: Types.KW_NUMBER,
+    Bool: Types.KW_BOOL,
+}
+
 DEFAULT_VALUES = {
-    "num": SignedNum(0),
+    "num": 0,
     "str": "",
     "bool": Bool(False),
 }
@@ -1,12 +1,19 @@
+import threading
+
 from constants import Types
 
 
 class Errors():
-    STRICT = False
+    # strict mode is kept per thread, so interpreters on different threads can run in different modes
+    local = threading.local()
 
     @staticmethod
     def set_strict(value):
-        Errors.STRICT = value
+        Errors.local.strict = value
+
+    @staticmethod
+    def is_strict():
+        return getattr(Errors.local, "strict", False)
 
 
 class SkipCommandError(Exception):
@@ -22,7 +29,7 @@ class UndefinedError(Exception):
     def __init__(self, var_name: str):
         self.message = f"`{var_name}` was used before definition."
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
@@ -34,7 +41,7 @@ class AlreadyDefinedError(Exception):
     def __init__(self, var_name: str):
         self.message = f"`{var_name}` has already been defined."
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
@@ -46,7 +53,7 @@ class UknownTypeError(Exception):
     def __init__(self, type: str):
         self.message = f"Uknown type `{type}`"
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
@@ -58,7 +65,7 @@ class InvalidVariableTypeError(Exception):
     def __init__(self, curr_type: str, actual_type: str):
         self.message = f"Cannot assign type `{Types.to_string(curr_type)}` to variable of type `{Types.to_string(actual_type)}`."
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
@@ -70,7 +77,7 @@ class InvalidArgumentTypeError(Exception):
     def __init__(self, name: str, arg_num: int, actual_type, curr_type: str):
         self.message = f"Argument {arg_num} of `{name}` must be of type `{Types.to_string(actual_type)}`, not `{Types.to_string(curr_type)}`."
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
@@ -82,7 +89,19 @@ class ArgumentNumberError(Exception):
     def __init__(self, name: str, range: list[int], given_num: int):
         self.message = f"`{name}` takes between {range[0]} and {range[1]} arguments. {given_num} were given."
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
+            super().__init__(self.message)
+        else:
+            raise SkipCommandError
+
+
+class InvalidPointerError(Exception):
+    # raised when a pointer goes to a command outside of the function it is in
+
+    def __init__(self, name: str, pointer: str):
+        self.message = f"Pointer `{pointer}` of `{name}` is out of range."
+
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
@@ -94,7 +113,48 @@ class ImportError(Exception):
     def __init__(self, file_name: str):
         self.message = f"Unable to import file: `{file_name}`."
 
-        if(Errors.STRICT):
+        if(Errors.is_strict()):
+            super().__init__(self.message)
+        else:
+            raise SkipCommandError
+
+
+class ImportCycleError(Exception):
+    # raised if a file is imported while it is still being imported. `files` goes from that file to the file importing it
+    # again
+
+    def __init__(self, files: list):
+        self.message = f"Import cycle: {' -> '.join(f'`{file.name}`' for file in files)}."
+
+        if(Errors.is_strict()):
             super().__init__(self.message)
         else:
             raise SkipCommandError
+
+
+class VerificationError(Exception):
+    # raised in strict mode, before the program runs, with every problem that was found when it was loaded
+
+    def __init__(self, problems: list):
+        self.problems = problems
+        self.message = "\n".join(f"Line {line}, column {column}: {message}" for line, column, message in problems)
+
+        super().__init__(self.message)
+
+
+class QuotaExceededError(Exception):
+    # raised when a run goes over one of the limits in its `Quota`, whether strict mode is on or not. `kind` is the name of
+    # the limit
+
+    def __init__(self, kind: str, limit):
+        self.kind = kind
+        self.limit = limit
+
+        self.message = {
+            "steps": f"Ran more than {limit} commands.",
+            "time": f"Ran for longer than {limit} seconds.",
+            "depth": f"Went more than {limit} calls deep.",
+            "strings": f"Strings took up more than {limit} characters.",
+        }[kind]
+
+        super().__init__(self.message)
@@ -1,101 +1,24 @@
 from typing import Union
 
-__all__ = ["SignedNum", "Bool"]
+__all__ = ["Number", "to_number", "Bool"]
 
 
-def get_flipped_sign(num, sign):
-    if(num >= 0 and sign):
-        return "+"
-    elif(num < 0 and sign):
-        return "-"
+Number = Union[int, float]
 
-    return ""
 
+def to_number(num: Union[float, int, str]) -> Number:
+    # numbers are plain `int`s, unless they have a decimal part. the sign of a pointer is kept on the parsed argument,
+    # not on the number, so nothing needs to be wrapped
+    if(isinstance(num, str)):
+        num = float(num)
 
-class SignedFloat(float):
+    if(isinstance(num, float)):
+        if(num.is_integer()):
+            return int(num)
 
-    def __new__(self, num: float, sign: str = ""):
-        return float.__new__(self, num)
+        return num
 
-    def __init__(self, num: float, sign: str = "") -> None:
-        self.num = float(num)
-        self.sign = sign
-
-    def get_sign(self) -> str:
-        return self.sign
-
-    def clamp(self, _min: int, _max: int):
-        num = max(_min, min(self.num, _max))
-        return SignedFloat(num, get_flipped_sign(num, self.sign))
-
-    def __mul__(self, other):
-        num = super(SignedFloat, self).__mul__(other)
-        return SignedFloat(num, get_flipped_sign(num, self.sign))
-
-    __rmul__ = __mul__
-
-    def __add__(self, other) -> int:
-        num = super(SignedFloat, self).__add__(other)
-        return SignedFloat(num, get_flipped_sign(num, self.sign))
-
-    __radd__ = __add__
-
-    def __sub__(self, other) -> int:
-        num = super(SignedFloat, self).__sub__(other)
-        return SignedFloat(num, get_flipped_sign(num, self.sign))
-
-    __rsub__ = __sub__
-
-
-class SignedInt(int):
-
-    def __new__(self, num: int, sign: str = ""):
-        return int.__new__(self, num)
-
-    def __init__(self, num: int, sign: str = "") -> None:
-        self.num = int(num)
-        self.sign = sign
-
-    def get_sign(self) -> str:
-        return self.sign
-
-    def clamp(self, _min: int, _max: int):
-        num = max(_min, min(self.num, _max))
-        return SignedInt(num, get_flipped_sign(num, self.sign))
-
-    def __mul__(self, other):
-        num = super(SignedInt, self).__mul__(other)
-        return SignedInt(num, get_flipped_sign(num, self.sign))
-
-    __rmul__ = __mul__
-
-    def __add__(self, other) -> int:
-        num = super(SignedInt, self).__add__(other)
-        return SignedInt(num, get_flipped_sign(num, self.sign))
-
-    __radd__ = __add__
-
-    def __sub__(self, other) -> int:
-        num = super(SignedInt, self).__sub__(other)
-        return SignedInt(num, get_flipped_sign(num, self.sign))
-
-    __rsub__ = __sub__
-
-
-class SignedNum():
-    # factory class for the different signed numbers
-
-    def __new__(self, num: Union[float, int, str], sign: str = ""):
-        if(isinstance(num, str)):
-            num = float(num)
-
-        if(isinstance(num, float)):
-            if(num.is_integer()):
-                return SignedInt(num, sign)
-            else:
-                return SignedFloat(num, sign)
-        else:
-            return SignedInt(num, sign)
+    return int(num)
 
 
 class Bool(int):
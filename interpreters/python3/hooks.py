@@ -0,0 +1,80 @@
+from pathlib import Path
+
+__all__ = ["Hook", "Hooks"]
+
+
+class Hook():
+    # override the events you want to be told about, the rest are never called. `scope` is the name of the function a
+    # command is in (or `global`), `elapsed` is how long the command took in seconds, not counting the commands of a
+    # file it imported
+
+    # a command ran
+    def on_command(self, command, scope: str, index: int, elapsed: float) -> None:
+        pass
+
+    # a command was skipped (see `SkipCommandError`)
+    def on_skip(self, command, scope: str, index: int, elapsed: float) -> None:
+        pass
+
+    # `command` called the function `name`, sent after `on_command` for the call
+    def on_call(self, name: str, command) -> None:
+        pass
+
+    # `command` returned from the function `name`, sent after `on_command` for the return
+    def on_return(self, name: str, command) -> None:
+        pass
+
+    # `file` was imported and is about to run
+    def on_import(self, file: Path) -> None:
+        pass
+
+    # `>` read `text`
+    def on_input(self, text: str) -> None:
+        pass
+
+    # `<` wrote `text`
+    def on_output(self, text: str) -> None:
+        pass
+
+
+# event -> the list in `Hooks` its handlers are kept in
+EVENTS = {
+    "on_command": "commands",
+    "on_skip": "skips",
+    "on_call": "calls",
+    "on_return": "returns",
+    "on_import": "imports",
+    "on_input": "inputs",
+    "on_output": "outputs",
+}
+
+
+class Hooks():
+    # the hooks of a program, shared by the interpreters of everything it imports. as long as no hooks are added the
+    # interpreter uses a loop that doesnt check for any of them
+    def __init__(self) -> None:
+        self.commands = []
+        self.skips = []
+        self.calls = []
+        self.returns = []
+        self.imports = []
+        self.inputs = []
+        self.outputs = []
+
+        self.active = False
+
+        # time spent running commands so far, used to take the commands of an imported file off of the time of `~`
+        self.time = 0
+
+    def add(self, hook: Hook) -> None:
+        # `hook` doesnt have to be a `Hook`, any object with some of the `on_` methods works
+        for event, handlers in EVENTS.items():
+            method = getattr(type(hook), event, None)
+
+            # skip the events that are left as they are in `Hook`
+            if(method is None or method is getattr(Hook, event)):
+                continue
+
+            getattr(self, handlers).append(getattr(hook, event))
+
+        self.active = True
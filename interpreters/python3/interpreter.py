@@ -1,25 +1,54 @@
 
 from dataclasses import dataclass, field
-from typing import Union, Any
+from typing import Iterable, Union, Any
 from pathlib import Path
-import hashlib
-import pickle
-import gzip
+import multiprocessing
+import threading
+import math
+import time
+import os
+
+from tokenise import find_functions, tokenise, tokenise_part
+from constants import ARG_TYPES, COMMANDS, DEFAULT_VALUES, OPCODES, VALUE_TYPES, Types
+from extended import Bool, Number, to_number
+from verify import verify
+from optimise import optimise, unfuse
+from intrinsics import INTRINSICS, NOT_NATIVE, find_intrinsics
+from bytecode import GLOBAL_SCOPE, CompiledProgram, is_compiled, write_program
+from streams import InputPending, InputSource, OutputSink, unescape
+from hooks import Hook, Hooks
+from cache import Cache
+from modules import MODULES, Module, Modules, find_imports, find_module
+from quotas import CHECK_EVERY, Quota
+# lots of errors :)
+from errors import Errors, AlreadyDefinedError, InvalidArgumentTypeError, InvalidVariableTypeError, QuotaExceededError, SkipCommandError, UknownTypeError, UndefinedError, ImportError, ImportCycleError
 
-import pprint
+__all__ = ["Interpreter", "interpret", "compile_program", "RUNNING", "WAITING", "DONE"]
 
-from tokenise import tokenise
-from constants import ARG_NUM, ARG_TYPES, DEFAULT_VALUES, Types
-from extended import Bool, SignedNum
-# lots of errors :)
-from errors import AlreadyDefinedError, ArgumentNumberError, InvalidArgumentTypeError, InvalidVariableTypeError, SkipCommandError, UknownTypeError, UndefinedError, ImportError
+# `Stack.push_frame` will create a new local stack
+# use quotes in the name since variables can't have quotes in their names so the scope could not possibly be
+# overridden
+GLOBAL_NAME = "\"global\""
 
-__all__ = ["interpret"]
+IMPORT = OPCODES["~"]
+SET_STR = OPCODES[":"]
+CALL = OPCODES["|"]
+RETURN = OPCODES["\\"]
 
-CACHE_FOLDER = Path("./.afcache")
-CACHE_FOLDER.mkdir(parents=True, exist_ok=True)
+# `Frame.fallback` when there isnt one
+NO_FALLBACK = object()
 
-GLOBAL_NAME = "\"global\""
+# the imports `Interpreter.preload` finds at once are loaded in worker processes if there are at least this many of them
+PARALLEL_IMPORTS = 8
+
+# strings shorter than this are just copied when they are appended to, longer ones are kept in pieces, see
+# `Variable.append`
+JOIN_SIZE = 4096
+
+# what `Interpreter.step` returns: there are more commands to run, `>` is waiting for a line, or the program has ended
+RUNNING = "running"
+WAITING = "waiting"
+DONE = "done"
 
 
 def add_vals(val1, val2):
@@ -42,18 +71,67 @@ class Variable():
     type: str
     value: Any
 
+    # the pieces of a long string that `&` has appended to, and how long it is. `value` is left out while there are any
+    chunks = None
+    size = 0
+
+    def __getattr__(self, name: str):
+        # only called when `value` isnt set, which means the string is in pieces. they are joined the first time it is
+        # read (by anything), and the string stays joined until it is appended to again
+        if(name != "value" or self.chunks is None):
+            raise AttributeError(name)
+
+        value = "".join(self.chunks)
+
+        self.chunks = None
+        self.value = value
+
+        return value
+
     def set_value(self, value) -> None:
-        types = {
-            Types.KW_STRING: ["str"],
-            Types.KW_NUMBER: ["SignedInt", "SignedFloat"],
-            Types.KW_BOOL: ["Bool"]
-        }
+        type = VALUE_TYPES.get(value.__class__)
+
+        if(type != self.type):
+            raise InvalidVariableTypeError(type if type is not None else value.__class__.__name__, self.type)
+
+        self.value = value
+
+        if(self.chunks is not None):
+            # the pieces of the old string, which nothing can read any more
+            self.chunks = None
 
-        if(value.__class__.__name__ not in types[self.type]):
-            raise InvalidVariableTypeError(value.__class__.__name__, self.type)
+    def append(self, text: str) -> None:
+        # `&`. copying the whole string every time makes building a long one a piece at a time take time in proportion to
+        # its length squared, so once it is long the pieces are kept in a list instead. each piece is merged into the one
+        # before it once it is at least as long, which keeps the list short (about log2 of the length) while only
+        # copying each character about that many times
+        chunks = self.chunks
+
+        if(chunks is None):
+            value = self.value
+
+            if(len(value) + len(text) < JOIN_SIZE):
+                self.value = value + text
+                return
 
-        elif(value.__class__.__name__ in types[self.type]):
-            self.value = value
+            self.chunks = chunks = [value]
+            self.size = len(value)
+
+            del self.value
+
+        chunks.append(text)
+        self.size += len(text)
+
+        while(len(chunks) > 1 and len(chunks[-1]) >= len(chunks[-2])):
+            last = chunks.pop()
+            chunks[-1] += last
+
+    def get_length(self) -> int:
+        # the length of a string, without joining it
+        if(self.chunks is None):
+            return len(self.value)
+
+        return self.size
 
     def set_type(self, type) -> None:
         self.type = type
@@ -62,77 +140,65 @@ class Variable():
 @dataclass
 class Command():
     name: str
+    op: int = None
     arguments: list = field(default_factory=list)
+    # absolute command indexes of a `#` / `?` pointers, see `verify`
+    targets: list = None
+    # where the command is in the file, for reporting problems
+    line: int = 0
+    column: int = 0
+    # the `\\` right after a `|`, which makes it a tail call (see `Interpreter.exec_call`)
+    tail: "Command" = None
+    # the commands a `BLOCK` / `BUILD` runs, see `optimise`
+    parts: list = None
+    # how many of the commands that were written this one runs, which is what the steps of a quota count
+    size: int = 1
+    # the folder of the file a `~` is in, which its path is relative to (`None` if it isnt in a file)
+    folder: Path = None
 
     @dataclass
     class Argument():
         type: Any
-        value: Union[str, SignedNum]
-
-    def add_argument(self, type: str, value) -> None:
-        self.arguments.append(Command.Argument(type, value))
-
-    def get_arg_check_type(self, num: int):
+        value: Union[str, Number]
+        # index of the variable in its scope, see `Interpreter.resolve`
+        slot: int = -1
+        # `+` / `-` if a number was written with a sign, which makes it a relative pointer
+        sign: str = ""
+
+    def add_argument(self, type: str, value, sign: str = "") -> None:
+        self.arguments.append(Command.Argument(type, value, sign=sign))
+
+    # the number of arguments and the types of literals have already been checked by `verify`, so only variables are
+    # checked here
+    def get_argument_checked(self, num: int, stack: "Stack") -> Union[Argument, Variable]:
         try:
-            # check number of arguments first
-            arg_num = ARG_NUM[self.name]
-            curr_num = len(self.arguments)
-
-            if(not curr_num >= arg_num[0] or (arg_num[1] is not None and not curr_num <= arg_num[1])):
-                raise ArgumentNumberError(self.name, arg_num, curr_num)
-
-            if(curr_num == 0):
-                return
-
             arg = self.arguments[num]
-            types = ARG_TYPES[self.name][num]
-
-            # manually type check functions
-            if(self.name in ["|", "/", "\\"]):
-                if(not Types.eq(arg.type, Types.VARIABLE)):
-                    raise InvalidArgumentTypeError(
-                        self.name, 1, Types.VARIABLE, arg.type)
-
-            # if it's a variable we cant check the type here, so we'll need to do it later
-            if(not Types.eq(arg.type, types) and not Types.eq(arg.type, Types.VARIABLE)):
-                raise InvalidArgumentTypeError(
-                    self.name, num + 1, types, arg.type)
-
-            return arg
-
         except IndexError:
+            # raise an error that we catch in the while loop to skip that iteration
             raise SkipCommandError
 
-    def get_argument_checked(self, num: int) -> Union[Argument, Variable]:
-        try:
-            arg = self.get_arg_check_type(num)
+        if(arg.type == Types.VARIABLE):
 
-            types = ARG_TYPES[self.name][num]
-
-            if(Types.eq(arg.type, Types.VARIABLE)):
+            # check if variable exists in the stack
+            var = stack.get_stack_variable(arg.value, arg.slot)
 
-                # check if variable exists in the stack
-                if(not STACK.is_stack_variable(arg.value)):
-                    raise UndefinedError(arg.value)
+            if(var is None):
+                raise UndefinedError(arg.value)
 
-                var = STACK.get_stack_variable(arg.value, True)
+            types = ARG_TYPES[self.name][num]
 
-                # check the actual type of the variable
-                if(not Types.eq(var.type, types)):
-                    raise InvalidArgumentTypeError(
-                        self.name, num + 1, types, var.type)
+            # check the actual type of the variable
+            if(not Types.eq(var.type, types)):
+                raise InvalidArgumentTypeError(
+                    self.name, num + 1, types, var.type)
 
-                return var
-            else:
-                return arg
+            return var
 
-        except IndexError:
-            # raise an error that we catch in the while loop to skip that iteration
-            raise SkipCommandError
+        return arg
 
     def get_argument_raw(self, num: int) -> Union[Argument, None]:
         try:
-            return self.get_arg_check_type(num)
+            return self.arguments[num]
         except IndexError:
             return None
 
@@ -162,109 +228,704 @@ class Pointer():
         self.set_pos(self.pos - abs(amount))
 
 
+class Frame():
+    # one scope on the stack: the global scope, or a call. variables live in `slots`, and `names` maps a name to its
+    # slot. `names` is shared by every frame of the same function so that the slots can be worked out once, when the
+    # program is loaded
+    __slots__ = ("scope", "names", "slots", "pos", "ret", "fallback")
+
+    def __init__(self, scope: Union[str, int], names: dict) -> None:
+        self.reset(scope, names)
+
+    def reset(self, scope: Union[str, int], names: dict, pos: int = 0, ret: Variable = None) -> None:
+        self.scope = scope
+        self.names = names
+        # a new list rather than clearing the old one, which is slower in cpython for lists this size. so a call still
+        # makes this list, the list of its parameters and a `Variable` for each of them, only the frame itself is reused
+        self.slots = [None] * len(names)
+
+        # where the caller carries on from once the call returns, and the variable that gets the return value
+        self.pos = pos
+        self.ret = ret
+
+        # what `ret` gets if it cant take the return value, see `Interpreter.exec_call`
+        self.fallback = NO_FALLBACK
+
+
 class Stack():
     def __init__(self, name: str):
         self.name = name
 
-        self.curr_scope = 0
+        # scope name -> (variable name -> slot)
+        self.symbols = {self.name: {}}
 
-        self.stack = [{
-            "scope": self.name,
-            "variables": [],
-            "calls": [],
-        }]
+        self.stack = [Frame(self.name, self.symbols[self.name])]
 
+        # the names of the functions, by index. `functions` is the other way around, so a call can find the index of a
+        # function without searching for it
         self.stack_funcs = []
+        self.functions = {}
 
-    def get_current_scope_name(self):
-        return self.stack[self.curr_scope]["scope"]
+        # function index -> the name of the std function it is, for the ones that can be run natively (see
+        # `intrinsics.py`)
+        self.intrinsics = {}
 
-    def push_new_call(self, name: str, pointer_pos: int, ret_var: Variable) -> None:
-        self.stack[self.curr_scope]["calls"].append({
-            "name": name,
-            "pos": pointer_pos,
-            "ret": ret_var,
-        })
+        # frames of calls that have returned, reused by the next calls so a call doesnt have to make a new one
+        self.pool = []
 
-    def pop_call(self) -> Union[None, object]:
-        try:
-            # pop the call from the previous scope
-            return self.stack[self.curr_scope - 1]["calls"].pop()
-        except IndexError:
-            return None
+        # the files that have been imported by this run (with their commands), and the ones that are
+        # still running (the last one is running now), see `Interpreter.exec_import`
+        self.modules = {}
+        self.importing = []
+
+    def copy(self) -> "Stack":
+        # a stack with the same functions and symbols but no variables, to run a loaded program again. the symbols are
+        # copied since running a program can add to them
+        stack = Stack(self.name)
+
+        stack.symbols = {scope: dict(names) for scope, names in self.symbols.items()}
+        stack.stack = [Frame(self.name, stack.symbols[self.name])]
+        stack.stack_funcs = list(self.stack_funcs)
+        stack.functions = dict(self.functions)
+        stack.intrinsics = dict(self.intrinsics)
+
+        return stack
+
+    def get_symbols(self, scope: Union[str, int]) -> dict:
+        return self.symbols.setdefault(scope, {})
+
+    def push_frame(self, scope: Union[str, int], pos: int, ret: Variable) -> Frame:
+        names = self.get_symbols(scope)
 
-    def new_stack_scope(self, name: str) -> None:
-        # push new scope to stack
-        self.stack.append({
-            "scope": name,
-            "variables": [],
-            "calls": [],
-        })
+        if(len(self.pool) > 0):
+            frame = self.pool.pop()
+            frame.reset(scope, names, pos, ret)
+        else:
+            frame = Frame(scope, names)
+            frame.pos = pos
+            frame.ret = ret
 
-        self.curr_scope = len(self.stack) - 1
+        self.stack.append(frame)
 
-    def remove_stack_scope(self, name: str) -> None:
-        for index, s in enumerate(self.stack):
-            if(s["scope"] == name):
-                self.stack.pop(index)
+        return frame
 
-        self.curr_scope = len(self.stack) - 1
-        return
+    def pop_frame(self) -> Union[Frame, None]:
+        # removes the frame of the current call, or returns `None` if we are not in a call. the frame is only good until
+        # the next call, after that it is reused
+        if(len(self.stack) < 2):
+            return None
+
+        frame = self.stack.pop()
+        self.pool.append(frame)
 
-    def push_stack_variable(self, var: Union[Variable, Function]) -> None:
+        return frame
+
+    def push_stack_variable(self, name: Union[str, int], var: Union[Variable, Function], slot: int = -1) -> None:
         # push to the current scope
-        self.stack[self.curr_scope]["variables"].append(var)
+        frame = self.stack[-1]
+
+        if(slot < 0):
+            slot = frame.names.setdefault(name, len(frame.names))
+
+        if(slot >= len(frame.slots)):
+            # the scope got new names after this frame was created (i.e. an import declared globals)
+            frame.slots.extend([None] * (slot + 1 - len(frame.slots)))
+
+        frame.slots[slot] = var
 
     def push_stack_function(self, name: str) -> None:
+        # if two functions have the same name, the first one is the one that gets called
+        self.functions.setdefault(name, len(self.stack_funcs))
         self.stack_funcs.append(name)
 
-    def get_stack_function_index(self, name: str) -> None:
-        return self.stack_funcs.index(name)
+    def get_stack_function_index(self, name: str) -> Union[int, None]:
+        return self.functions.get(name)
 
-    def get_variable(self, scope, name, _raise):
+    # gets a variable that is visible from the current scope. `slot` is where the variable was resolved to when the
+    # program was loaded, or -1 if it isnt declared in the scope that uses it
+    def get_stack_variable(self, name: Union[str, int], slot: int = -1) -> Union[Variable, Function, None]:
+        if(slot >= 0):
+            try:
+                var = self.stack[-1].slots[slot]
 
-        # get all the scopes up until ours because we dont need to search a scope "lower down" since we couldnt possibly
-        # get a variable from there anyway
-        # then reverse the scopes so that we start searching at out scope, and work our way up to the global scope
-        for scope in self.stack[:self.curr_scope + 1][::-1]:
-            for var in scope["variables"]:
-                if(var.name == name):
+                if(var is not None):
                     return var
+            except IndexError:
+                pass
 
-        # `_raise` determines whether to skip that command if the variable doesnt exist
-        if(_raise):
-            raise SkipCommandError
+        # otherwise search from our scope, and work our way down to the global scope
+        for frame in reversed(self.stack):
+            index = frame.names.get(name)
+
+            if(index is not None and index < len(frame.slots)):
+                var = frame.slots[index]
+
+                if(var is not None):
+                    return var
 
         return None
 
-    # gets a variable from the current scope
-    def get_stack_variable(self, name: str, _raise: bool = False) -> Union[Variable, Function]:
-        return self.get_variable(self.curr_scope, name, _raise)
+    # like `get_stack_variable`, but the other calls of the function we are in are left out. `$` uses it so that every
+    # call of a recursive function declares its own variables
+    def get_declared_variable(self, name: Union[str, int], slot: int = -1) -> Union[Variable, Function, None]:
+        current = self.stack[-1]
 
-    def is_stack_variable(self, name: str) -> bool:
-        for scope in self.stack[:self.curr_scope + 1][::-1]:
-            for var in scope["variables"]:
-                if(var.name == name):
-                    return True
+        if(0 <= slot < len(current.slots) and current.slots[slot] is not None):
+            return current.slots[slot]
 
-        return False
+        for frame in reversed(self.stack):
+            if(frame.scope == current.scope and frame is not current):
+                continue
 
+            index = frame.names.get(name)
 
-# `STACK.new_stack_scope` will create a new local stack
-# use quotes in the name since variables can't have quotes in their names so the scope could not possibly be
-# overridden
-STACK = Stack(GLOBAL_NAME)
+            if(index is not None and index < len(frame.slots)):
+                var = frame.slots[index]
+
+                if(var is not None):
+                    return var
+
+        return None
+
+    def get_string_size(self) -> int:
+        # the number of characters in every string variable that is still around
+        return sum(var.get_length() for frame in self.stack for var in frame.slots
+                   if isinstance(var, Variable) and var.type == Types.KW_STRING)
+
+
+def resolve_scope(commands: list, names: dict) -> None:
+    # see `Interpreter.resolve`
+    for command in commands:
+        if(command.name == "$" and len(command.arguments) > 0 and Types.eq(command.arguments[0].type, Types.VARIABLE)):
+            names.setdefault(command.arguments[0].value, len(names))
+
+    for index, command in enumerate(commands):
+        for arg in command.arguments:
+            if(Types.eq(arg.type, Types.VARIABLE)):
+                arg.slot = names.get(arg.value, -1)
+
+        if(command.op == CALL and index + 1 < len(commands) and commands[index + 1].op == RETURN):
+            command.tail = commands[index + 1]
+
+
+class LazyCommands(dict):
+    # the commands of a program by scope. the commands of the scopes in `pending` are only made the first time they are
+    # looked up, by the function `pending` has for them (which is given the scope), see `Interpreter.load_compiled` and
+    # `Interpreter.load_import`. the functions keep what they made, so a program that is run again doesnt make them again
+    def __init__(self, pending: dict = None) -> None:
+        super().__init__()
+
+        self.pending = pending if pending is not None else {}
+
+    def __missing__(self, scope: Union[str, int]) -> list:
+        read = self.pending.get(scope)
+
+        if(read is None):
+            raise KeyError(scope)
+
+        commands = self[scope] = read(scope)
+
+        return commands
+
+    def copy(self) -> "LazyCommands":
+        commands = LazyCommands(dict(self.pending))
+        commands.update(self)
+
+        return commands
+
+    def merge(self, commands: "LazyCommands") -> None:
+        # adds the scopes of `commands` that arent here yet, without making the ones it hasnt made
+        for scope, function in commands.items():
+            self.setdefault(scope, function)
+
+        for scope, read in commands.pending.items():
+            if(scope not in self):
+                self.pending.setdefault(scope, read)
 
 
 class Interpreter():
-    def __init__(self, tokens: list) -> None:
-        self.commands: object[Union[str, int], list[Command]] = {}
+    # everything a program uses while it runs belongs to its interpreter, so any number of them can run in the same
+    # process (i.e. on different threads). `tokens` is loaded straight away if it is given, see `run` for the rest
+    def __init__(self, tokens: Iterable = None, parent: "Interpreter" = None, output: OutputSink = None, input: InputSource = None,
+                 hooks: Hooks = None, cache: Cache = None, strict: bool = None, quota: Quota = None, optimise: int = 1,
+                 intrinsics: bool = True, modules: Modules = None) -> None:
+        self.commands: LazyCommands[Union[str, int], list[Command]] = LazyCommands()
+
+        # the file the program was loaded from, if it was, which is where its imports are found from
+        self.file = None
+
+        # a loaded interpreter can be shared between threads, its runs just take turns
+        self.lock = threading.Lock()
+
+        # `stack` and `commands` as they were once the program was loaded, every run starts from a copy of them
+        self.program = None
+
+        # the optimisation level the program was loaded at, see `add_hook`
+        self.program_level = 0
+
+        # (output, input, stdout) from before the current run, put back by `stop`
+        self.saved = None
+
+        if(parent is not None):
+            # an imported file. its top level code runs in the scope of whoever imported it, and it shares everything
+            # else with them too
+            self.imported = True
+
+            self.stack = parent.stack
+            self.output = parent.output
+            self.input = parent.input
+            self.hooks = parent.hooks
+            self.cache = parent.cache
+            self.modules = parent.modules
+            self.strict = parent.strict
+            self.quota = parent.quota
+            self.optimise = parent.optimise
+            self.intrinsics = parent.intrinsics
+
+            # the stepped run this file was imported into, if any
+            self.task = parent.task
+        else:
+            self.imported = False
+
+            # the variables, functions and calls of the program
+            self.stack = Stack(GLOBAL_NAME)
+
+            # where `<` writes to
+            self.output = output if output is not None else OutputSink()
+
+            # where `>` reads from
+            self.input = input if input is not None else InputSource()
+
+            # tracing, profiling etc, see `add_hook`
+            self.hooks = hooks if hooks is not None else Hooks()
+
+            # where compiled imports are kept
+            self.cache = cache if cache is not None else Cache()
+
+            # every file that has been imported, loaded once and shared with every import of it
+            self.modules = modules if modules is not None else MODULES
+
+            self.strict = strict if strict is not None else Errors.is_strict()
+
+            # limits on every run, see `check_quota`
+            self.quota = quota
+
+            # 0 runs the commands as they were written, 1 runs them through `optimise` when they are loaded
+            self.optimise = optimise
+
+            # whether the std functions are run natively when they can be, see `call_intrinsic`
+            self.intrinsics = intrinsics
+
+            # the (interpreter, pointer) of every file that is running, the last one is the file that runs next. only
+            # used when the program is run with `step`
+            self.task = None
+
+        # the limits that are checked as the commands run, rather than between slices of `step`
+        self.max_depth = math.inf
+        self.max_string = math.inf
+
+        if(self.quota is not None):
+            if(self.quota.depth is not None):
+                self.max_depth = self.quota.depth
+
+            if(self.quota.strings is not None):
+                self.max_string = self.quota.strings
+
+        # commands run and when the run has to end by, for the quota
+        self.steps = 0
+        self.deadline = None
+
+        handlers = {
+            "~": self.exec_import,
+            "$": self.exec_declare,
+            "+": self.exec_add,
+            "=": self.exec_set_num,
+            "%": self.exec_compare,
+            ":": self.exec_set_str,
+            "&": self.exec_concat,
+            "!": self.exec_invert,
+            ".": self.exec_lower,
+            "@": self.exec_clamp,
+            "\"": self.exec_to_str,
+            "1": self.exec_to_num,
+            "#": self.exec_goto,
+            "?": self.exec_branch,
+            "/": self.exec_func,
+            "\\": self.exec_return,
+            "|": self.exec_call,
+            ">": self.exec_input,
+            "<": self.exec_output,
+        }
+
+        # indexed by `Command.op`, followed by `SKIP`, `BLOCK`, `BUILD` and `COMPARE`
+        self.handlers = [handlers[name] for name in COMMANDS] + [self.exec_skip, self.exec_block, self.exec_build,
+                                                                      self.exec_compare_branch]
+
+        if(tokens is not None):
+            self.load(tokens)
+
+    def load(self, tokens: Iterable, file: Path = None) -> None:
+        # `file` is the file the tokens were read from, if they were, which relative imports are found from
+        Errors.set_strict(self.strict)
+
+        self.file = file
+
+        if(not self.imported):
+            # forget the last program
+            self.stack = Stack(GLOBAL_NAME)
+            self.commands = LazyCommands()
 
         self.interp(tokens)
+        verify(self.commands)
+        find_intrinsics(self.commands, self.stack)
+
+        if(self.get_optimise_level() > 0):
+            optimise(self.commands)
+
+        self.resolve()
+
+        if(not self.imported):
+            self.program = (self.stack.copy(), self.commands.copy())
+            self.program_level = self.get_optimise_level()
+            self.preload()
+
+    def load_compiled(self, file: Path) -> None:
+        # loads a program written by `compile_program`. only the functions and their variables are read here, the
+        # commands of a function are read, optimised and resolved the first time it is called (see `LazyCommands`)
+        Errors.set_strict(self.strict)
+
+        self.file = file.resolve()
+        program = CompiledProgram(file)
+
+        if(self.strict and not program.clean):
+            program.close()
+            raise ValueError(f"{file.name} has problems that strict mode doesnt allow, compile it with --strict to see them.")
+
+        self.stack = Stack(GLOBAL_NAME)
+
+        for name in program.functions:
+            self.stack.push_stack_function(name)
+
+        level = self.get_optimise_level()
+
+        for scope in program.variables:
+            self.stack.symbols[GLOBAL_NAME if scope == GLOBAL_SCOPE else scope] = program.get_symbols(scope, level)
+
+        # the std functions are only run natively if they are still the ones the interpreter knows
+        for index, digest in program.digests.items():
+            intrinsic = INTRINSICS.get(program.functions[index])
+
+            if(intrinsic is not None and intrinsic.digest == digest):
+                self.stack.intrinsics[index] = intrinsic.name
+
+        # the symbols of every scope are already complete, so resolving the commands doesnt add to them
+        symbols = self.stack.copy().symbols
+        loaded = {}
+
+        # the file is closed once every scope has been read, and runs on other threads can read scopes at the same time
+        lock = threading.Lock()
+
+        if(len(program.scopes) == 0):
+            program.close()
+
+        def read(scope: Union[str, int]) -> list:
+            with lock:
+                if(scope in loaded):
+                    return loaded[scope]
+
+                commands = read_scope(scope)
+                loaded[scope] = commands
+
+                if(len(loaded) == len(program.scopes)):
+                    program.close()
+
+                return commands
+
+        def read_scope(scope: Union[str, int]) -> list:
+            commands = [Command(name, op, [Command.Argument(type, value, sign=sign) for type, value, sign in arguments], targets,
+                                line, column)
+                        for name, op, line, column, arguments, targets in program.read_scope(GLOBAL_SCOPE if scope == GLOBAL_NAME else scope)]
+
+            if(level > 0):
+                commands = {scope: commands}
+                optimise(commands)
+                commands = commands[scope]
+
+            for command in commands:
+                if(command.op == IMPORT):
+                    command.folder = self.file.parent
+
+            resolve_scope(commands, symbols[scope])
+
+            return commands
+
+        self.commands = LazyCommands({(GLOBAL_NAME if key == GLOBAL_SCOPE else key): read for key in program.scopes})
+
+        if(GLOBAL_SCOPE in program.scopes):
+            # it runs first anyway
+            self.commands[GLOBAL_NAME]
+
+        self.program = (self.stack.copy(), self.commands.copy())
+        self.program_level = level
+
+        # only the imports of the commands that have been read so far are found, the rest are loaded when they run
+        self.preload()
+
+    def load_source(self, source) -> None:
+        # `source` is a compiled program (see `compile_program`), or anything `tokenise` takes
+        if(is_compiled(source)):
+            self.load_compiled(source)
+        else:
+            self.load(tokenise(source), source.resolve() if isinstance(source, Path) else None)
+
+    def preload(self) -> None:
+        # loads every file the program imports with a literal path, and every file those import and so on, before the
+        # program runs, so a `~` only has to add what was loaded to the stack. files that fail to load are left for their
+        # `~` to report when it runs, the same as if they hadnt been loaded yet
+        strict = self.strict
+        level = self.get_optimise_level()
+
+        files = find_imports(self.commands)
+        seen = set(files)
+
+        while(len(files) > 0):
+            missing = [file for file in files if file.exists() and self.modules.get(file, strict, level) is None]
+
+            for file in missing:
+                cached = self.cache.load(file, strict, level)
+
+                if(cached is not None):
+                    self.modules.add(file, file.stat(), cached, strict, level)
+
+            # the rest are loaded all at once, see `parse_modules`
+            jobs = [(file, strict, level) for file in missing if self.modules.get(file, strict, level) is None]
+
+            for (file, _, _), parsed in zip(jobs, parse_modules(jobs)):
+                if(parsed is not None):
+                    stat, data = parsed
+
+                    self.cache.save(file, stat, data, strict, level)
+                    self.modules.add(file, stat, data, strict, level)
+
+            found = []
+
+            for file in files:
+                module = self.modules.get(file, strict, level)
+
+                if(module is None):
+                    continue
+
+                for imported in module.imports:
+                    if(imported not in seen):
+                        seen.add(imported)
+                        found.append(imported)
+
+            files = found
+
+    def clone(self) -> "Interpreter":
+        # a new interpreter with the same settings and the program this one has loaded, which it can run at the same time
+        # as this one. the program is shared (every run starts from a copy of it anyway), the hooks are not
+        interp = Interpreter(cache=self.cache, strict=self.strict, quota=self.quota, optimise=self.optimise,
+                             intrinsics=self.intrinsics, modules=self.modules)
+        interp.program = self.program
+        interp.program_level = self.program_level
+        interp.file = self.file
+
+        return interp
+
+    def start(self, source=None, stdin=None, stdout=None, wait: bool = True) -> None:
+        # gets ready to run the program, either with `step` or `exec`, until `stop` is called. loads `source` (a path, the
+        # code itself or a stream, see `tokenise`) first, leave it out to run the program that is already loaded again.
+        # `stdin` and `stdout` are used instead of the interpreter's input and output for this run, they can be anything
+        # `InputSource` and `OutputSink` take (or one of them). if another run of this interpreter hasnt been stopped yet,
+        # this waits for it, or raises a `RuntimeError` straight away without `wait`
+        if(not self.lock.acquire(blocking=wait)):
+            raise RuntimeError("The interpreter is already running a program, use `clone` to run it again at the same time.")
+
+        try:
+            if(source is not None):
+                self.load_source(source)
+
+            if(self.program is None):
+                raise ValueError("No program has been loaded.")
+        except BaseException:
+            self.lock.release()
+            raise
+
+        self.saved = (self.output, self.input, stdout)
+
+        if(stdout is not None):
+            self.output = stdout if isinstance(stdout, OutputSink) else OutputSink(stdout)
+
+        if(stdin is not None):
+            self.input = stdin if isinstance(stdin, InputSource) else InputSource(stdin)
+
+        stack, commands = self.program
+
+        self.stack = stack.copy()
+        self.commands = commands.copy()
+
+        if(self.file is not None):
+            # the program itself, which nothing it imports can import again
+            self.stack.modules[self.file] = LazyCommands()
+            self.stack.importing.append(self.file)
+
+        self.steps = 0
+
+        if(self.quota is not None and self.quota.time is not None):
+            self.deadline = time.monotonic() + self.quota.time
+        else:
+            self.deadline = None
+
+        Errors.set_strict(self.strict)
+
+    def stop(self) -> None:
+        # ends the run begun by `start`, and writes whatever output is left (even if the program stopped because of an
+        # error)
+        output, input, stdout = self.saved
+
+        self.task = None
+        self.saved = None
+
+        try:
+            if(self.output is not output and self.output is not stdout):
+                # made for this run
+                self.output.close()
+            else:
+                self.output.flush()
+        finally:
+            self.output = output
+            self.input = input
+
+            self.lock.release()
+
+    def run(self, source=None, stdin=None, stdout=None) -> None:
+        # runs the whole program in one go, see `start`
+        self.start(source, stdin, stdout)
+
+        try:
+            if(self.quota is None):
+                self.exec()
+            else:
+                # the quota is checked between slices of commands, so the commands themselves dont have to
+                while(True):
+                    state = self.step(CHECK_EVERY)
+
+                    if(state == DONE):
+                        break
+
+                    if(state == WAITING):
+                        # nothing is going to give it a line
+                        raise InputPending
+        finally:
+            self.stop()
+
+    def check_quota(self) -> None:
+        # called between slices of `step`, so the clock and the strings are only looked at every so often
+        quota = self.quota
+
+        if(quota.steps is not None and self.steps >= quota.steps):
+            raise QuotaExceededError("steps", quota.steps)
+
+        if(self.deadline is not None and time.monotonic() > self.deadline):
+            raise QuotaExceededError("time", quota.time)
+
+        if(quota.strings is not None and self.stack.get_string_size() > quota.strings):
+            raise QuotaExceededError("strings", quota.strings)
+
+    def step(self, count: int) -> str:
+        # runs at most `count` more commands of the run begun by `start`, so a program can be run a bit at a time (i.e. on
+        # an event loop, see `sessions.py`). returns `RUNNING` if there are more commands to run, `WAITING` if `>` needs a
+        # line that hasnt been given yet (see `QueueInput`) or `DONE` once the program has ended. imports are run by this
+        # loop as well, so they can be paused too
+        if(self.task is None):
+            self.task = [(self, Pointer(GLOBAL_NAME, 0))]
+
+        task = self.task
+        quota = self.quota
+
+        if(quota is not None and quota.steps is not None):
+            # stop right at the limit, `check_quota` will raise if there is more to run
+            count = min(count, quota.steps - self.steps)
+
+        requested = count
+
+        # whether this slice ends where the quota does
+        stopping = quota is not None and quota.steps is not None and self.steps + requested >= quota.steps
+
+        # strict mode is kept per thread, and other programs could have run on this thread since the last step
+        Errors.set_strict(self.strict)
+
+        while(len(task) > 0):
+            interp, pointer = task[-1]
+
+            handlers = interp.handlers
+            commands = interp.commands
+            hooked = interp.hooks.active
+
+            while(pointer.pos < len(commands[pointer.func_scope_name])):
+                scope = pointer.func_scope_name
+                index = pointer.pos
+                command: Command = commands[scope][index]
+
+                # a command `optimise` made out of several counts as all of them, so a quota stops a program after the
+                # same commands at every level
+                if(count < command.size):
+                    if(stopping and count > 0):
+                        # the quota runs out part way through it, so only the commands that fit are run
+                        pointer.move_forward(1)
+                        interp.exec_parts(unfuse(command)[:count], pointer)
+                        count = 0
+
+                    # otherwise it starts the next slice, unless it is bigger than a whole slice
+                    if(count < requested or count <= 0 or stopping):
+                        self.steps += requested - count
+
+                        if(quota is not None):
+                            self.check_quota()
+
+                        return RUNNING
+
+                count -= command.size
+
+                try:
+                    if(hooked):
+                        interp.exec_hooked_command(command, pointer)
+                    else:
+                        pointer.move_forward(1)
+
+                        try:
+                            handlers[command.op](command, pointer)
+                        except SkipCommandError:
+                            pass
+                except InputPending:
+                    # `>` runs again once there is a line for it
+                    pointer.set_func_scope(scope)
+                    pointer.set_pos(index)
+
+                    self.steps += requested - count - 1
+
+                    return WAITING
+
+                if(command.op == IMPORT):
+                    # run the imported file (if it was imported), see `exec_import`
+                    break
+            else:
+                # the file has ended, carry on with whoever imported it
+                task.pop()
+
+                if(interp.imported):
+                    self.stack.importing.pop()
+
+        self.steps += requested - count
+
+        return DONE
 
-    def interp(self, tokens: list) -> list[Command]:
-        # default is "global" (with quotes)
-        scopes = [GLOBAL_NAME]
+    def interp(self, tokens: list, scope: Union[str, int] = GLOBAL_NAME) -> list[Command]:
+        # `scope` is the scope the tokens are in, default is "global" (with quotes)
+        scopes = [scope]
+
+        folder = self.file.parent if self.file is not None else None
 
         current_command = None
 
@@ -273,7 +934,11 @@ class Interpreter():
                 break
 
             elif(token.type == "COMMAND"):
-                current_command = Command(token.value)
+                # lower the command name to its opcode now so `exec` never has to compare names
+                current_command = Command(token.value, OPCODES[token.value], line=token.line, column=token.column)
+
+                if(current_command.op == IMPORT):
+                    current_command.folder = folder
 
             elif(token.type == "R_BRACK"):
                 try:
@@ -289,11 +954,17 @@ class Interpreter():
 
                 if(current_command.name == "/"):
 
-                    if(Types.eq(current_command.arguments[0].type, Types.VARIABLE)):
-                        STACK.push_stack_function(
+                    if(len(current_command.arguments) > 0 and Types.eq(current_command.arguments[0].type, Types.VARIABLE)):
+                        self.stack.push_stack_function(
                             current_command.arguments[0].value)
 
-                        scopes.insert(0, len(STACK.stack_funcs) - 1)
+                        scopes.insert(0, len(self.stack.stack_funcs) - 1)
+
+                        # the parameters are the first variables in the function's scope
+                        names = self.stack.get_symbols(scopes[0])
+
+                        for arg in current_command.arguments[1:]:
+                            names.setdefault(arg.value, len(names))
 
                 elif(current_command.name == "\\"):
                     scopes.pop(0)
@@ -303,11 +974,9 @@ class Interpreter():
             elif(Types.eq(token.type, Types.VARIABLE)):
                 current_command.add_argument(Types.VARIABLE, token.value)
 
-            elif(Types.eq(token.type, Types.ANY_NUMBER)):
+            elif(Types.eq(token.type, Types.ANY_LT_NUMBER)):
                 # the `replace` will either leave `+` or `-` or just `` if there is no sign
-                val = SignedNum(token.value, get_sign(token.type))
-
-                current_command.add_argument(Types.LT_NUMBER, val)
+                current_command.add_argument(Types.LT_NUMBER, to_number(token.value), get_sign(token.type))
 
             elif(Types.eq(token.type, Types.LT_BOOL)):
                 current_command.add_argument(Types.LT_BOOL, Bool(token.value))
@@ -316,404 +985,887 @@ class Interpreter():
                 current_command.add_argument(token.type, token.value)
 
             elif(Types.eq(token.type, Types.LT_STRING)):
-                current_command.add_argument(Types.LT_STRING, token.value)
+                # escapes are turned into the characters they stand for once, here, instead of every time a string is
+                # output. import paths are left alone since they can have backslashes in them
+                if(current_command.name != "~"):
+                    current_command.add_argument(Types.LT_STRING, unescape(token.value))
+                else:
+                    current_command.add_argument(Types.LT_STRING, token.value)
+
+    def resolve(self) -> None:
+        # gives every variable that is declared in a scope a slot in that scope, and points all the arguments that use it
+        # at that slot. looking the variable up while the scope is running is then just an index into the frame.
+        # anything else (globals used inside a function, or a variable declared by the caller) is left as `-1` and is
+        # searched for by name, since which scopes are below us on the stack is only known at runtime
+        for scope, commands in self.commands.items():
+            # the top level code of an import runs in the scope that imported it, so it cant be resolved ahead of time
+            if(scope == GLOBAL_NAME and self.imported):
+                continue
+
+            resolve_scope(commands, self.stack.get_symbols(scope))
+
+    def get_optimise_level(self) -> int:
+        # hooks are told about every command, so they see the program as it was written
+        return 0 if self.hooks.active else self.optimise
+
+    def get_scope_name(self, scope: Union[str, int]) -> str:
+        # functions are only known by their index while the program runs
+        if(scope == GLOBAL_NAME):
+            return "global"
+
+        return self.stack.stack_funcs[scope]
+
+    def add_hook(self, hook: Hook) -> None:
+        # hooks see the program as it was written (see `get_optimise_level`), so a program that was already loaded
+        # optimised is loaded again from its file. one that wasnt loaded from a file cant be, so its hooks have to be
+        # added before it is loaded
+        reload = self.program is not None and self.program_level > 0
+
+        if(reload and self.file is None):
+            raise ValueError("The program was optimised when it was loaded, add hooks before loading it or load it with "
+                             "optimise=0.")
+
+        self.hooks.add(hook)
+
+        if(reload):
+            self.load_source(self.file)
 
     def exec(self) -> None:
+        if(self.hooks.active):
+            return self.exec_hooked()
+
         pointer = Pointer(GLOBAL_NAME, 0)
 
-        # to allow for better recursion, we DONT check if a variable is already defined
-        # if the function is recursive
-        # this allows you to define variables in a function, without needed to pass them as arguments,
-        # while also calling the function recursively
-        is_recursive = False
+        # every command was lowered to an opcode when it was loaded, so dispatching is a single index into this table
+        # instead of comparing the command name against every command in turn
+        handlers = self.handlers
+        commands = self.commands
 
-        while(pointer.pos < len(self.commands[pointer.func_scope_name])):
-            command: Command = self.commands[pointer.func_scope_name][pointer.pos]
-            name = command.name
+        while(pointer.pos < len(commands[pointer.func_scope_name])):
+            command: Command = commands[pointer.func_scope_name][pointer.pos]
 
             pointer.move_forward(1)
 
-            # if strict mode is off, argument types and the number of arguments are not checked therefore there is no guarantee that
-            # any of these command will have all the arguments required. to fix this we could check whether all the commands / command values
-            # are `None` however this is messy and creates a lot of duplicated code.
-            # instead, if the value requested does not exist, the `get_argument_value` will raise a `SkipCommand` error. this will be
-            # caught by this try catch, and will just skip that command which is the desired behaviour.
+            # the number of arguments and the types of literals were checked by `verify`, but whether a variable exists and
+            # what type it is can only be checked now. if strict mode is off and a variable is wrong, `get_argument_checked`
+            # will raise a `SkipCommand` error. this will be caught by this try catch, and will just skip that command which
+            # is the desired behaviour.
             # it only catches `SkipCommand` so that any other exceptions will pass through
             try:
-                if(name == "~"):
-                    file = Path(command.get_argument_checked(0).value)
+                handlers[command.op](command, pointer)
 
-                    interp = Interpreter([])
+            # skip command
+            except SkipCommandError:
+                continue
 
-                    if(not file.exists()):
-                        raise ImportError(file.name)
+    def exec_hooked(self) -> None:
+        # the same as `exec`, but the hooks are told about every command. it is a separate loop so that `exec` doesnt pay
+        # anything for hooks when there aren't any
+        pointer = Pointer(GLOBAL_NAME, 0)
 
-                    # if(is_cache_up_to_date(file)):
-                    #     interp.commands = get_cached_import_arguments(file)
-                    #     pprint.pprint(interp.commands)
-                    #     interp.exec()
+        commands = self.commands
 
-                    # else:
-                    tokens = tokenise(file)
+        while(pointer.pos < len(commands[pointer.func_scope_name])):
+            self.exec_hooked_command(commands[pointer.func_scope_name][pointer.pos], pointer)
 
-                    interp.__init__(tokens)
+    def exec_hooked_command(self, command: Command, pointer: Pointer) -> None:
+        # runs the command `pointer` is on and tells the hooks about it
+        hooks = self.hooks
+        clock = time.perf_counter
 
-                    # convert tokens to commands and cache them to the file
-                    cache_imported_arguments(interp.commands, file)
+        scope = pointer.func_scope_name
+        index = pointer.pos
 
-                    for k, v in interp.commands.items():
-                        self.commands.setdefault(k, v)
+        pointer.move_forward(1)
 
-                    interp.exec()
+        # `~` runs the commands of the imported file, which are timed on their own so they are taken off of its time
+        nested = hooks.time
+        start = clock()
 
-                elif(name == "$"):
-                    if(is_recursive):
-                        raise SkipCommandError
+        try:
+            self.handlers[command.op](command, pointer)
+        except SkipCommandError:
+            elapsed = clock() - start - (hooks.time - nested)
+            hooks.time += elapsed
 
-                    var = command.get_argument_raw(0)
-                    type = command.get_argument_raw(1)
+            for hook in hooks.skips:
+                hook(command, self.get_scope_name(scope), index, elapsed)
 
-                    # should be the only time we have to check whether something is `None`, since the variable might not exist
-                    if(var is None or type is None):
-                        raise SkipCommandError
+            return
 
-                    try:
-                        DEFAULT_VALUES[type.value]
-                    except KeyError:
-                        raise UknownTypeError(type.value)
+        elapsed = clock() - start - (hooks.time - nested)
+        hooks.time += elapsed
 
-                    value = DEFAULT_VALUES[type.value]
+        for hook in hooks.commands:
+            hook(command, self.get_scope_name(scope), index, elapsed)
 
-                    if(not STACK.is_stack_variable(var.value)):
-                        STACK.push_stack_variable(
-                            Variable(var.value, type.type, value))
-                    else:
-                        raise AlreadyDefinedError(var.value)
-
-                elif(name == "="):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-
-                    var1.set_value(var2.value)
-
-                elif(name == "+"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-
-                    var1.set_value(
-                        add_vals(var1.value, var2.value))
-
-                elif(name == "%"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-                    var3 = command.get_argument_checked(2)
-
-                    try:
-                        if(var1.value == var2.value):
-                            var3.set_value(SignedNum(0))
-                        elif(var1.value > var2.value):
-                            var3.set_value(SignedNum(1))
-                        else:
-                            var3.set_value(SignedNum(-1, "-"))
-                    except TypeError:
-                        var3.set_value(SignedNum(-1, "-"))
-
-                elif(name == ":"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-
-                    var1.set_value(var2.value)
-
-                elif(name == "&"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-
-                    var1.set_value(str(var1.value) + str(var2.value))
-
-                elif(name == "!"):
-                    var1 = command.get_argument_checked(0)
-
-                    if(var1.type == Types.KW_STRING):
-                        var1.set_value(var1.value.upper())
-                    elif(var1.type == Types.KW_BOOL):
-                        # the ~ is the bitwise NOT operator.
-                        # it is used because in `Bool` we have overridden the `__invert__` method which is called when using
-                        # that operator
-                        var1.set_value(~var1.value)
-                    elif(var1.type == Types.KW_NUMBER):
-                        var1.set_value(var1.value * -1)
-
-                elif(name == "."):
-                    var1 = command.get_argument_checked(0)
-
-                    var1.set_value(var1.value.lower())
-                elif(name == "@"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-                    var3 = command.get_argument_checked(2)
-
-                    if(var1.type == Types.KW_STRING):
-                        var1.set_value(var1.value[var2.value:var3.value])
-                    elif(var1.type == Types.KW_NUMBER):
-                        var1.set_value(var1.value.clamp(
-                            var2.value, var3.value))
-
-                elif(name == "\""):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-
-                    if(var1.type == Types.KW_NUMBER):
-                        var2.set_value(str(var1.value))
-                    elif(var1.type == Types.KW_BOOL):
-                        var2.set_value(str(var1.value))
-
-                elif(name == "1"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
-
-                    try:
-                        var2.set_value(SignedNum(var1.value))
-                    except ValueError:
-                        var2.set_value(0)
-
-                elif(name == "#"):
-                    var1 = command.get_argument_checked(0)
-
-                    if(var1.value.get_sign() == "+"):
-                        pointer.move_forward(var1.value - 1)
-                    elif(var1.value.get_sign() == "-"):
-                        pointer.move_backward(var1.value - 1)
+        if(command.op == CALL):
+            for hook in hooks.calls:
+                hook(self.get_scope_name(pointer.func_scope_name), command)
 
-                    else:
-                        pointer.set_pos(var1.value - 1)
+        elif(command.op == RETURN):
+            for hook in hooks.returns:
+                hook(self.get_scope_name(scope), command)
 
-                elif(name == "?"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
+    def exec_skip(self, command: Command, pointer: Pointer) -> None:
+        # the command can never run, see `verify`
+        pass
 
-                    if(var1.value):
-                        if(var2.value.get_sign() == "+"):
-                            pointer.move_forward(var2.value - 1)
-                        elif(var2.value.get_sign() == "-"):
-                            pointer.move_backward(var2.value - 1)
+    def exec_block(self, command: Command, pointer: Pointer) -> None:
+        # a run of commands that just change variables (see `optimise`). only the last one can move the pointer
+        self.exec_parts(command.parts, pointer)
 
-                        else:
-                            pointer.set_pos(var2.value - 1)
+    def exec_parts(self, parts: list, pointer: Pointer) -> None:
+        # each one is skipped on its own like it would have been
+        handlers = self.handlers
 
-                    elif(len(command.arguments) == 3):
-                        var3 = command.get_argument_checked(2)
+        for part in parts:
+            try:
+                handlers[part.op](part, pointer)
+            except SkipCommandError:
+                pass
 
-                        if(var3.value.get_sign() == "+"):
-                            pointer.move_forward(var3.value - 1)
-                        elif(var3.value.get_sign() == "-"):
-                            pointer.move_backward(var3.value - 1)
+    def exec_build(self, command: Command, pointer: Pointer) -> None:
+        # a run of `:` / `&` on the same string (see `optimise`), which only looks the string up and changes it once. a
+        # part whose value cant be used is skipped on its own like it would have been
+        parts = command.parts
+        var1 = parts[0].get_argument_checked(0, self.stack)
 
-                        else:
-                            pointer.set_pos(var3.value - 1)
+        # what `:` set the string to (if it was run), and the text appended after that
+        start = None
+        pieces = []
 
-                elif(name == "/"):
-                    # the func name (argument 0) is a symbol (variable) but isnt actually a variable defined yet
-                    # so we need to get it without checking if it exists
+        for part in parts:
+            try:
+                var2 = part.get_argument_checked(1, self.stack)
+            except SkipCommandError:
+                continue
 
-                    var1 = command.get_argument_raw(0)
+            if(var2 is var1):
+                # appending a string to itself uses what it has been built up to so far
+                self.set_built(var1, start, pieces)
 
-                    if(STACK.is_stack_variable(var1.value)):
-                        raise AlreadyDefinedError(var1.value)
+                start = None
+                pieces = []
 
-                    arguments = []
+            if(part.op == SET_STR):
+                start = var2.value
+                pieces = []
+            else:
+                pieces.append(str(var2.value))
 
-                    if(len(command.arguments) > 1):
-                        arguments = command.arguments[1:]
+        self.set_built(var1, start, pieces)
 
-                    # pass down all arguments except the type
-                    func = Function(STACK.get_stack_function_index(
-                        var1.value), arguments)
+    def set_built(self, var: Variable, start: Union[str, None], pieces: list) -> None:
+        text = "".join(pieces)
 
-                    # create func and define in the current scope
-                    STACK.push_stack_variable(func)
+        if(start is not None):
+            value = start + text
 
-                elif(name == "\\"):
-                    var1 = command.get_argument_raw(0)
+            if(len(value) > self.max_string):
+                raise QuotaExceededError("strings", self.max_string)
 
-                    ret_val = ""
+            var.set_value(value)
+        elif(text != ""):
+            if(var.get_length() + len(text) > self.max_string):
+                raise QuotaExceededError("strings", self.max_string)
 
-                    if(var1 is not None and not STACK.is_stack_variable(var1.value)):
-                        raise UndefinedError(var1.value)
+            var.append(text)
 
-                    elif(var1 is not None):
-                        # get the value of the return value
-                        ret_val = STACK.get_stack_variable(var1.value).value
+    def exec_compare_branch(self, command: Command, pointer: Pointer) -> None:
+        # `%(a, b, c)`, `@(c, 0, 1)` and `?(c, ...)` (see `optimise`). once `%` has set `c` it is -1, 0 or 1, so the clamp
+        # and the branch can be worked out from that without looking at `c` again
+        compare, clamp, branch = command.parts
 
-                    # remove the old function call
-                    old_call = STACK.pop_call()
+        try:
+            var1 = compare.get_argument_checked(0, self.stack)
+            var2 = compare.get_argument_checked(1, self.stack)
+            var3 = compare.get_argument_checked(2, self.stack)
+        except SkipCommandError:
+            # `c` is left as it was, so it could be anything
+            return self.exec_parts(command.parts[1:], pointer)
 
-                    # ignore if the call stack is empty
-                    if(old_call == None):
-                        raise SkipCommandError
+        try:
+            # -1 is clamped to 0
+            value = 1 if var1.value != var2.value and var1.value > var2.value else 0
+        except TypeError:
+            value = 0
 
-                    # remove function scope once it has returned
-                    STACK.remove_stack_scope(old_call["name"])
+        var3.set_value(value)
 
-                    if(old_call["ret"] is not None):
-                        old_call["ret"].set_value(ret_val)
+        target = branch.targets[0] if value else branch.targets[1]
 
-                    # we just removed the function's scope so `get_current_scope_name` will return the correct scope
-                    pointer.set_func_scope(STACK.get_current_scope_name())
+        if(target is not None):
+            pointer.pos = target
 
-                    # take the place where the function was called, move the pointer to there
-                    # to avoid calling it infinitely
-                    pointer.set_pos(old_call["pos"])
+    def exec_import(self, command: Command, pointer: Pointer) -> None:
+        path = command.get_argument_checked(0, self.stack).value
+        file = find_module(path, command.folder)
 
-                elif(name == "|"):
-                    var1 = command.get_argument_raw(0)
+        if(not file.exists()):
+            raise ImportError(Path(path).name)
 
-                    # try and get the function
-                    func = STACK.get_stack_variable(
-                        STACK.get_stack_function_index(var1.value))
+        stack = self.stack
 
-                    if(func is None):
-                        raise UndefinedError(var1.value)
+        if(file in stack.importing):
+            raise ImportCycleError(stack.importing[stack.importing.index(file):] + [file])
 
-                    ret_var = None
+        if(file in stack.modules):
+            # an earlier `~` of this run already put its functions on the stack, but it still runs again every time, since
+            # the functions it declares are only declared in the scope the `~` runs in
+            interp = Interpreter(parent=self)
+            interp.file = file
+            interp.commands = stack.modules[file]
+        else:
+            interp = self.load_import(file)
+            stack.modules[file] = interp.commands
 
-                    argument_values = []
+        for hook in self.hooks.imports:
+            hook(file)
 
-                    if(len(command.arguments) > 1):
+        self.commands.merge(interp.commands)
 
-                        # try and get all the values of the arguments passed to the function
-                        # and put them in the array
-                        for arg in command.arguments[1:len(func.arguments) + 1]:
+        stack.importing.append(file)
 
-                            if(Types.eq(arg.type, Types.VARIABLE)):
-                                val = STACK.get_stack_variable(arg.value)
+        if(self.task is not None):
+            # being run with `step`, which runs the file next and takes it off of `importing` once it has ended
+            self.task.append((interp, Pointer(GLOBAL_NAME, 0)))
+        else:
+            try:
+                interp.exec()
+            finally:
+                stack.importing.pop()
 
-                                if(val is None):
-                                    raise UndefinedError(arg.value)
+    def load_import(self, file: Path) -> "Interpreter":
+        # the functions of a file are numbered from wherever the stack is up to when it is imported, so they are loaded
+        # numbered from 0 and moved along to where the stack is now
+        module = self.get_module(file)
+        stack = self.stack
+        first = len(stack.stack_funcs)
 
-                                argument_values.append(
-                                    {"type": val.type, "value": val.value})
-                            else:
-                                # constants are allowed as arguments to a function so their type need to be converted
-                                # from a literal to the respective keyword type
-                                argument_values.append(
-                                    {"type": Types.LITERAL_TO_VAR[arg.type], "value": arg.value})
+        for name in module.functions:
+            stack.push_stack_function(name)
 
-                        # if the number of arguments in this command is greater than the number of parameters in the function + 1,
-                        # consider the last argument to be the return value
-                        if(len(command.arguments[1:]) > len(func.arguments)):
-                            ret_var = command.get_argument_raw(-1)
+        strict = self.strict
+        level = self.get_optimise_level()
 
-                            if(not STACK.is_stack_variable(ret_var.value)):
-                                raise UndefinedError(ret_var.value)
+        def read(scope: int) -> list:
+            # a function that wasnt loaded with the rest of the file, see `load_function`
+            index = scope - first
+            commands = load_function(module, index, strict, level)
 
-                            ret_var = STACK.get_stack_variable(ret_var.value)
+            # the variables it declares go after the ones it already had, in the same slots they have in the module
+            names = stack.symbols[scope]
 
-                            if(not Types.eq(ret_var.type, Types.ANY_VAR)):
-                                raise InvalidArgumentTypeError(command.name, len(
-                                    func.arguments), Types.ANY_VAR, ret_var.type)
+            for name in module.symbols[index]:
+                names.setdefault(name, len(names))
 
-                    # add function call to history
-                    STACK.push_new_call(func.name, pointer.pos, ret_var)
+            intrinsic = module.intrinsics.get(index)
 
-                    # avoid creating a new scope (and variables) on every call (if the function is recursive)
-                    if(STACK.get_current_scope_name() != func.name):
-                        is_recursive = False
+            if(intrinsic is not None):
+                stack.intrinsics[scope] = intrinsic
 
-                        # to execute the function, first create a new scope
-                        STACK.new_stack_scope(func.name)
+                # it can only run natively if the std functions it calls were found to be std functions too
+                for call in INTRINSICS[intrinsic].calls:
+                    callee = stack.functions.get(call)
 
-                        # once the function scope has been defined, all the parameters need to be defined as variables
-                        # using the values we got from the arguments earlier
-                        for index, arg in enumerate(func.arguments):
-                            STACK.push_stack_variable(
-                                Variable(arg.value, argument_values[index]["type"], argument_values[index]["value"]))
+                    if(callee is not None and first <= callee < first + len(module.functions) and callee not in stack.intrinsics):
+                        read(callee)
 
-                    elif(STACK.get_current_scope_name() == func.name):
-                        # if we are calling ourself from ourself, it is now recursive
-                        is_recursive = True
+            return commands
 
-                    # # move the pointer to inside of the function
-                    pointer.set_func_scope(func.name)
-                    pointer.set_pos(0)
+        interp = Interpreter(parent=self)
+        interp.file = module.file
 
-                elif(name == ">"):
-                    var1 = command.get_argument_checked(0)
-                    var2 = command.get_argument_checked(1)
+        # functions are loaded by other threads while the module is copied
+        with module.lock:
+            for index, names in module.symbols.items():
+                # running the file can add to them
+                stack.symbols[first + index] = dict(names)
 
-                    inp = input(">: ")
+            for index, name in module.intrinsics.items():
+                stack.intrinsics[first + index] = name
 
-                    if(Types.eq(var1.type, Types.KW_NUMBER)):
-                        try:
-                            inp = SignedNum(inp)
-                        except ValueError:
-                            raise SkipCommandError
-                    elif(Types.eq(var1.type, Types.KW_BOOL)):
-                        if(inp == "true"):
-                            inp = Bool(True)
-                        elif(inp == "false"):
-                            inp = Bool(False)
-                        else:
-                            raise SkipCommandError
-
-                    var2.set_value(inp)
-
-                elif(name == "<"):
-                    var = command.get_argument_checked(0)
-
-                    # unescapes the string
-                    print(str(var.value).encode(
-                        "utf-8").decode("unicode-escape"))
+            interp.commands = LazyCommands({first + index: read for index in module.bodies})
+            interp.commands.update((k if k == GLOBAL_NAME else first + k, v) for k, v in module.commands.items())
 
-            # skip command
+        return interp
+
+    def get_module(self, file: Path) -> Module:
+        # `file` as it was loaded by this process, the import cache or loaded now, in that order
+        strict = self.strict
+        level = self.get_optimise_level()
+
+        module = self.modules.get(file, strict, level)
+
+        if(module is not None):
+            return module
+
+        cached = self.cache.load(file, strict, level)
+
+        if(cached is not None):
+            return self.modules.add(file, file.stat(), cached, strict, level)
+
+        stat, data = parse_module(file, strict, level)
+        self.cache.save(file, stat, data, strict, level)
+
+        return self.modules.add(file, stat, data, strict, level)
+
+    def exec_declare(self, command: Command, pointer: Pointer) -> None:
+        var = command.get_argument_raw(0)
+        type = command.get_argument_raw(1)
+
+        # should be the only time we have to check whether something is `None`, since the variable might not exist
+        if(var is None or type is None):
+            raise SkipCommandError
+
+        try:
+            DEFAULT_VALUES[type.value]
+        except KeyError:
+            raise UknownTypeError(type.value)
+
+        value = DEFAULT_VALUES[type.value]
+
+        if(self.stack.get_declared_variable(var.value, var.slot) is None):
+            self.stack.push_stack_variable(
+                var.value, Variable(var.value, type.type, value), var.slot)
+        else:
+            raise AlreadyDefinedError(var.value)
+
+    def exec_set_num(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        var1.set_value(var2.value)
+
+    def exec_add(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        var1.set_value(
+            add_vals(var1.value, var2.value))
+
+    def exec_compare(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+        var3 = command.get_argument_checked(2, self.stack)
+
+        try:
+            if(var1.value == var2.value):
+                var3.set_value(0)
+            elif(var1.value > var2.value):
+                var3.set_value(1)
+            else:
+                var3.set_value(-1)
+        except TypeError:
+            var3.set_value(-1)
+
+    def exec_set_str(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        var1.set_value(var2.value)
+
+    def exec_concat(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        text = str(var2.value)
+
+        # the rest of the quota is only checked every so often, but a string can double in size with every `&`
+        if(self.max_string is not math.inf and var1.get_length() + len(text) > self.max_string):
+            raise QuotaExceededError("strings", self.max_string)
+
+        var1.append(text)
+
+    def exec_invert(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+
+        if(var1.type == Types.KW_STRING):
+            var1.set_value(var1.value.upper())
+        elif(var1.type == Types.KW_BOOL):
+            # the ~ is the bitwise NOT operator.
+            # it is used because in `Bool` we have overridden the `__invert__` method which is called when using
+            # that operator
+            var1.set_value(~var1.value)
+        elif(var1.type == Types.KW_NUMBER):
+            var1.set_value(var1.value * -1)
+
+    def exec_lower(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+
+        var1.set_value(var1.value.lower())
+
+    def exec_clamp(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+        var3 = command.get_argument_checked(2, self.stack)
+
+        if(var1.type == Types.KW_STRING):
+            var1.set_value(var1.value[var2.value:var3.value])
+        elif(var1.type == Types.KW_NUMBER):
+            var1.set_value(max(var2.value, min(var1.value, var3.value)))
+
+    def exec_to_str(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        if(var1.type == Types.KW_NUMBER):
+            var2.set_value(str(var1.value))
+        elif(var1.type == Types.KW_BOOL):
+            var2.set_value(str(var1.value))
+
+    def exec_to_num(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        try:
+            var2.set_value(to_number(var1.value))
+        except ValueError:
+            var2.set_value(0)
+
+    def exec_goto(self, command: Command, pointer: Pointer) -> None:
+        target = command.targets[0]
+
+        if(target is None):
+            raise SkipCommandError
+
+        pointer.pos = target
+
+    def exec_branch(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+
+        # a `None` target means the pointer was invalid (or there is no else pointer), so nothing happens
+        target = command.targets[0] if var1.value else command.targets[1]
+
+        if(target is not None):
+            pointer.pos = target
+
+    def exec_func(self, command: Command, pointer: Pointer) -> None:
+        # the func name (argument 0) is a symbol (variable) but isnt actually a variable defined yet
+        # so we need to get it without checking if it exists
+
+        var1 = command.get_argument_raw(0)
+
+        if(self.stack.get_stack_variable(var1.value, var1.slot) is not None):
+            raise AlreadyDefinedError(var1.value)
+
+        arguments = []
+
+        if(len(command.arguments) > 1):
+            arguments = command.arguments[1:]
+
+        # pass down all arguments except the type
+        func = Function(self.stack.get_stack_function_index(
+            var1.value), arguments)
+
+        # create func and define in the current scope
+        self.stack.push_stack_variable(func.name, func)
+
+    def exec_return(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_raw(0)
+
+        ret_val = ""
+
+        if(var1 is not None):
+            ret_var = self.stack.get_stack_variable(var1.value, var1.slot)
+
+            if(ret_var is None):
+                raise UndefinedError(var1.value)
+
+            # get the value of the return value
+            ret_val = ret_var.value
+
+        # remove the frame of the call, which is always the last one
+        frame = self.stack.pop_frame()
+
+        # ignore if we arent in a call
+        if(frame is None):
+            raise SkipCommandError
+
+        # carry on in the caller from just after the call
+        pointer.set_func_scope(self.stack.stack[-1].scope)
+        pointer.set_pos(frame.pos)
+
+        if(frame.ret is None):
+            return
+
+        if(frame.fallback is not NO_FALLBACK and VALUE_TYPES.get(ret_val.__class__) != frame.ret.type):
+            # the variable the tail call would have stored the value in couldnt take it, so that variable's value is
+            # returned instead, see `exec_call`. in strict mode it is an error, like it would have been there
+            try:
+                raise InvalidVariableTypeError(VALUE_TYPES.get(ret_val.__class__, ret_val.__class__.__name__), frame.ret.type)
             except SkipCommandError:
-                continue
+                ret_val = frame.fallback
 
+        frame.ret.set_value(ret_val)
 
-def interpret(tokens: list) -> None:
-    return Interpreter(tokens).exec()
+    def exec_call(self, command: Command, pointer: Pointer) -> None:
+        stack = self.stack
+        name = command.arguments[0].value
 
+        # try and get the function. it has to have been declared (by `/`) somewhere we can see it
+        index = stack.get_stack_function_index(name)
+        func = stack.get_stack_variable(index) if index is not None else None
 
-def cache_imported_arguments(arguments, file):
-    file = Path(file)
-    name = file.name.replace(file.suffix, "")
-    c_name = f"{name}-af.afc"
+        if(func is None):
+            raise UndefinedError(name)
 
-    raw_code = open(file, "r")
-    raw_file_md5sum = hashlib.md5(raw_code.read().encode()).hexdigest()
-    raw_code.close()
+        commands = self.commands
 
-    # open gzip file and write hash and pickled data
-    with gzip.open(CACHE_FOLDER / c_name, "wb") as f:
-        f.write(raw_file_md5sum.encode() + pickle.dumps(arguments))
+        if(func.name not in commands and func.name in commands.pending):
+            # an imported function that is called for the first time, which has to be loaded before it can be run
+            # natively as well, see `Interpreter.load_import`
+            commands[func.name]
 
+        parameters = func.arguments
+        arguments = command.arguments
 
-def is_cache_up_to_date(file):
-    file = Path(file)
-    name = file.name.replace(file.suffix, "")
-    c_name = f"{name}-af.afc"
+        ret_var = None
 
-    if(not (CACHE_FOLDER / c_name).exists()):
-        return False
+        # if the number of arguments in this command is greater than the number of parameters in the function + 1,
+        # consider the last argument to be the return value
+        if(len(arguments) - 1 > len(parameters)):
+            ret_arg = arguments[-1]
 
-    with gzip.open(CACHE_FOLDER / c_name, "rb") as f:
-        # md5 hash always 32 characters long
-        md5sum = f.read()[0:32].decode()
+            if(ret_arg.type != Types.VARIABLE):
+                raise InvalidArgumentTypeError(command.name, len(arguments), Types.VARIABLE, ret_arg.type)
 
-        raw_code = open(file, "r")
-        raw_file_md5sum = hashlib.md5(raw_code.read().encode()).hexdigest()
-        raw_code.close()
+            ret_var = stack.get_stack_variable(ret_arg.value, ret_arg.slot)
 
-        # gets the stored md5 hash and the (new) hash of the file
-        # if they are equal the file hasnt changed
+            if(ret_var is None):
+                raise UndefinedError(ret_arg.value)
 
-        return md5sum == raw_file_md5sum
+            if(not Types.eq(ret_var.type, Types.ANY_VAR)):
+                raise InvalidArgumentTypeError(command.name, len(parameters), Types.ANY_VAR, ret_var.type)
 
+        # the parameters are made from the arguments before the new frame is pushed, since variables passed as arguments
+        # are looked up in the scope of the caller
+        values = []
+
+        for parameter, arg in zip(parameters, arguments[1:]):
+            if(arg.type == Types.VARIABLE):
+                val = stack.get_stack_variable(arg.value, arg.slot)
+
+                if(val is None):
+                    raise UndefinedError(arg.value)
+
+                values.append(Variable(parameter.value, val.type, val.value))
+            else:
+                # constants are allowed as arguments to a function so their type need to be converted
+                # from a literal to the respective keyword type
+                values.append(Variable(parameter.value, Types.LITERAL_TO_VAR[arg.type], arg.value))
+
+        # parameters that werent given are numbers set to 0, like in the node interpreter
+        for parameter in parameters[len(values):]:
+            values.append(Variable(parameter.value, Types.KW_NUMBER, DEFAULT_VALUES["num"]))
+
+        intrinsic = stack.intrinsics.get(func.name)
+
+        if(intrinsic is not None and self.intrinsics):
+            value = self.call_intrinsic(INTRINSICS[intrinsic], values)
+
+            if(value is not NOT_NATIVE):
+                if(ret_var is not None):
+                    ret_var.set_value(value)
+
+                return
+
+        frame = stack.stack[-1]
+
+        if(command.tail is not None and frame.scope == func.name and not self.hooks.active):
+            # a function calling itself right before it returns. when the return would just hand the value of the call
+            # to our caller, the call can take over our frame instead of pushing a new one, so the recursion runs in
+            # constant space. only calls of the function we are in are replaced: another function could use our
+            # variables (the scoping is dynamic), and those are gone once our frame is. hooks are told about every frame,
+            # so nothing is replaced when there are any
+            tail = self.get_tail_call(command.tail, ret_var, frame)
+
+            if(tail is not None):
+                ret, fallback = tail
+                pos = frame.pos
+
+                stack.pop_frame()
+                frame = stack.push_frame(func.name, pos, ret)
+                frame.fallback = fallback
+
+                for var in values:
+                    frame.slots[frame.names[var.name]] = var
+
+                pointer.set_pos(0)
+
+                return
+
+        frame = stack.push_frame(func.name, pointer.pos, ret_var)
+
+        if(len(stack.stack) - 1 > self.max_depth):
+            raise QuotaExceededError("depth", self.max_depth)
+
+        # the parameters are the first variables in the function's scope, see `interp`
+        for var in values:
+            frame.slots[frame.names[var.name]] = var
+
+        # move the pointer to inside of the function
+        pointer.set_func_scope(func.name)
+        pointer.set_pos(0)
+
+    def call_intrinsic(self, intrinsic, values: list) -> Any:
+        # the value a std function returns, worked out in python instead of by running it (see `intrinsics.py`), or
+        # `NOT_NATIVE` if it has to be run. the std functions use the variables of whoever calls them when they have the
+        # same names, so the native function is only used when it cant tell the difference
+        stack = self.stack
+
+        # hooks are told about every command, and the steps and strings of a quota are counted exactly
+        if(self.hooks.active or (self.quota is not None and (self.quota.steps is not None or self.quota.strings is not None))):
+            return NOT_NATIVE
+
+        if(self.strict and not intrinsic.strict):
+            return NOT_NATIVE
+
+        # the call would have gone over the quota somewhere inside of it
+        if(len(stack.stack) - 1 + intrinsic.depth > self.max_depth):
+            return NOT_NATIVE
+
+        for name in intrinsic.calls:
+            index = stack.functions.get(name)
+
+            if(stack.intrinsics.get(index) != name or stack.get_stack_variable(index) is None):
+                return NOT_NATIVE
+
+        for name in intrinsic.names:
+            if(stack.get_stack_variable(name) is not None):
+                return NOT_NATIVE
+
+        return intrinsic.function(*values)
+
+    def get_tail_call(self, tail: Command, ret_var: Variable, frame: Frame) -> Union[tuple, None]:
+        # returns the (ret, fallback) that the frame of a tail call needs to give our caller the same value we would, or
+        # `None` if it cant
+        ret_arg = tail.get_argument_raw(0)
+
+        if(ret_var is None):
+            # nothing is returned, which is only the same if our caller isnt expecting anything either (otherwise it gets
+            # "")
+            if(ret_arg is None and frame.ret is None):
+                return (None, NO_FALLBACK)
+
+            return None
+
+        # the value of the call has to be what is returned
+        if(ret_arg is None or self.stack.get_stack_variable(ret_arg.value, ret_arg.slot) is not ret_var):
+            return None
+
+        if(frame.ret is None):
+            # our caller doesnt want the value, but `ret_var` still has to be able to take it
+            return (ret_var, NO_FALLBACK)
+
+        if(frame.ret.type != ret_var.type):
+            return None
+
+        # if the value isnt the right type, it is never stored in `ret_var` and we return what was there
+        return (frame.ret, ret_var.value)
+
+    def exec_input(self, command: Command, pointer: Pointer) -> None:
+        var1 = command.get_argument_checked(0, self.stack)
+        var2 = command.get_argument_checked(1, self.stack)
+
+        if(self.input.is_interactive()):
+            # make sure everything that was output before asking for input can be seen
+            self.output.flush()
+
+        inp = self.input.read_line()
+
+        # all the input given up front has been used
+        if(inp is None):
+            raise SkipCommandError
+
+        for hook in self.hooks.inputs:
+            hook(inp)
+
+        if(Types.eq(var1.type, Types.KW_NUMBER)):
+            try:
+                inp = to_number(inp)
+            except ValueError:
+                raise SkipCommandError
+        elif(Types.eq(var1.type, Types.KW_BOOL)):
+            if(inp == "true"):
+                inp = Bool(True)
+            elif(inp == "false"):
+                inp = Bool(False)
+            else:
+                raise SkipCommandError
+
+        var2.set_value(inp)
+
+    def exec_output(self, command: Command, pointer: Pointer) -> None:
+        var = command.get_argument_checked(0, self.stack)
+
+        text = str(var.value)
+
+        # string literals were unescaped when the program was loaded
+        self.output.write_line(text)
+
+        for hook in self.hooks.outputs:
+            hook(text)
+
+
+def interpret(tokens: Iterable, output: OutputSink = None, input: InputSource = None, hooks: Hooks = None) -> None:
+    Interpreter(tokens, output=output, input=input, hooks=hooks).run()
+
+
+def tokenise_global(text: str, functions: list) -> Iterable:
+    # the tokens of `text` without the commands of the functions `find_functions` found in it, apart from the `\\` that
+    # ends each of them
+    pos = 0
+
+    for start, end, _ in functions:
+        for token in tokenise_part(text, pos, start):
+            if(token.type != "EOF"):
+                yield token
+
+        pos = end
+
+    yield from tokenise_part(text, pos, len(text))
+
+
+def load_module(file: Path, tokens: Iterable, strict: bool, level: int) -> tuple:
+    # (the root interpreter, the interpreter of the file) with `tokens` of `file` loaded as an import of nothing
+    root = Interpreter(cache=Cache(None), strict=strict, optimise=level)
+    interp = Interpreter(parent=root)
+    interp.load(tokens, file)
+
+    return root, interp
+
+
+def parse_module(file: Path, strict: bool, level: int) -> tuple:
+    # loads an imported file on its own, with its functions numbered from 0. returns the `stat` of the file from before it
+    # was read, and what the import cache keeps for it (see `Modules.add`). only the code outside of the functions is
+    # loaded, a function is loaded the first time it is called (see `load_function`). in strict mode every function is
+    # loaded now, so every problem in the file is found when it is imported
+    stat = file.stat()
+
+    text = file.read_text(encoding="utf-8")
+    functions = find_functions(text) if not strict else None
+
+    if(functions is not None):
+        root, interp = load_module(file, tokenise_global(text, functions), strict, level)
+
+        if(len(functions) != len(root.stack.stack_funcs)):
+            # `interp` didnt find the same functions, so the file is loaded all at once after all
+            functions = None
+
+    if(functions is None):
+        root, interp = load_module(file, tokenise(text), strict, level)
+
+    stack = root.stack
+    symbols = {index: names for index, names in stack.symbols.items() if index != GLOBAL_NAME}
+    bodies = {}
+
+    if(functions is not None):
+        for index, (start, _, last) in enumerate(functions):
+            # the function only has its `\\` so far, if it has one
+            interp.commands.pop(index, None)
+
+            if(last > start):
+                bodies[index] = (start, last)
+    else:
+        text = None
+
+    return stat, (stack.stack_funcs, symbols, stack.intrinsics, dict(interp.commands), text, bodies)
+
+
+def load_function(module: Module, index: int, strict: bool, level: int) -> list:
+    # the commands of a function of `module` that was left to be loaded when it is first called (see `parse_module`).
+    # they are kept in the module, so every other import of the file has them from then on
+    with module.lock:
+        commands = module.commands.get(index)
+
+        if(commands is not None):
+            return commands
+
+        start, end = module.bodies[index]
+
+        root = Interpreter(cache=Cache(None), strict=strict, optimise=level)
+        Errors.set_strict(root.strict)
+
+        stack = root.stack
+        stack.stack_funcs = module.functions
+        stack.symbols[index] = module.symbols[index]
+
+        root.file = module.file
+        root.interp(tokenise_part(module.text, start, end), index)
+
+        verify(root.commands)
+        find_intrinsics(root.commands, stack)
+
+        if(root.get_optimise_level() > 0):
+            optimise(root.commands)
+
+        # only the parameters are in the symbols of the function yet, the rest are added now
+        commands = root.commands[index]
+        resolve_scope(commands, module.symbols[index])
+
+        if(index in stack.intrinsics):
+            module.intrinsics[index] = stack.intrinsics[index]
+
+        module.commands[index] = commands
+        del module.bodies[index]
+
+        return commands
+
+
+def try_parse_module(job: tuple) -> Union[tuple, None]:
+    # `parse_module`, or `None` if the file cant be loaded. the `~` that imports it reports why when it runs
+    try:
+        return parse_module(*job)
+    except Exception:
+        return None
+
+
+def parse_modules(jobs: list) -> list:
+    # `try_parse_module` for every (file, strict, level) in `jobs`, in worker processes if there are enough of them to be
+    # worth starting the processes for. the workers of `batch.py` cant start processes of their own
+    processes = min(len(jobs), os.cpu_count() or 1)
+
+    if(len(jobs) < PARALLEL_IMPORTS or processes < 2 or multiprocessing.current_process().daemon):
+        return [try_parse_module(job) for job in jobs]
+
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(try_parse_module, jobs)
+
+
+def compile_program(source, file: Path, strict: bool = None) -> None:
+    # writes `source` (anything `tokenise` takes) to `file` in the form `Interpreter.load_compiled` loads, see
+    # `bytecode.py`. the program is verified as it is in strict mode if `strict` is set, and not optimised, so it can be
+    # run at any level
+    interp = Interpreter(strict=strict)
+    Errors.set_strict(interp.strict)
+
+    # loaded up to where it would be optimised and resolved, so only the parameters are in the symbols yet
+    interp.file = source.resolve() if isinstance(source, Path) else None
+    interp.interp(tokenise(source))
+    verify(interp.commands)
+    find_intrinsics(interp.commands, interp.stack)
+
+    # the compiled program finds its imports from where it is, so the ones found from where the source is are moved
+    # along to there
+    for function in interp.commands.values():
+        for command in function:
+            if(command.op != IMPORT or command.arguments[0].type != Types.LT_STRING or command.folder is None):
+                continue
+
+            imported = command.folder / command.arguments[0].value
+
+            if(not Path(command.arguments[0].value).is_absolute() and imported.exists()):
+                try:
+                    command.arguments[0].value = os.path.relpath(imported, file.resolve().parent)
+                except ValueError:
+                    # on another drive
+                    command.arguments[0].value = str(imported.resolve())
 
-def get_cached_import_arguments(file):
-    file = Path(file)
-    name = file.name.replace(file.suffix, "")
-    c_name = f"{name}-af.afc"
+    stack = interp.stack
+    digests = {index: INTRINSICS[name].digest for index, name in stack.intrinsics.items()}
+    parameters = {scope: names for scope, names in stack.symbols.items() if scope != GLOBAL_NAME}
+    commands = {(GLOBAL_SCOPE if scope == GLOBAL_NAME else scope): function for scope, function in interp.commands.items()}
 
-    with gzip.open(CACHE_FOLDER / c_name, "rb") as f:
-        # skip the md5 hash (32 characters)
-        return pickle.loads(f.read()[32:])
+    write_program(file, stack.stack_funcs, digests, parameters, commands)
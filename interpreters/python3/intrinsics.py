@@ -0,0 +1,371 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+import hashlib
+
+from constants import Types
+from extended import Bool
+
+__all__ = ["Intrinsic", "INTRINSICS", "NOT_NATIVE", "find_intrinsics"]
+
+# what a native function returns when it cant give exactly what the std function would, which is then run as it was
+# written instead
+NOT_NATIVE = object()
+
+# the most floats `mult` adds up one at a time, and the most times `pow` calls `mult`. past this it is left to the std
+# function, which can be stopped by the time quota
+LOOP_LIMIT = 1000000
+
+# floats bigger than this cant be counted down to 0 one at a time, so the loops of `mult` and `pow` would never end
+EXACT_FLOAT = 2 ** 53
+
+
+@dataclass
+class Intrinsic():
+    name: str
+    # takes the `Variable`s the call would have started with, and returns the value `\\` would have returned or
+    # `NOT_NATIVE`
+    function: Callable
+    # every variable that the function and the functions it calls declare with `$`. if one of them can already be seen
+    # from where it is called, the `$` is skipped and the caller's variable is used (and changed) instead, so it is only
+    # run natively when none of them can be seen
+    names: frozenset
+    # the std functions it calls, which have to be the ones that are found by their names
+    calls: frozenset
+    # how many frames deep it goes, itself included
+    depth: int
+    # whether none of its commands are skipped (for the values the native function takes), since that would be an error
+    # in strict mode
+    strict: bool
+    # of the function the native one was written for, see `fingerprint`
+    digest: str
+
+
+def fingerprint(name: str, parameters: list, commands: list) -> str:
+    # a function is only run natively if it is exactly the std function, so a file that has a different function with
+    # the same name always runs its own
+    text = repr((name, parameters, [(command.name, [(arg.type, arg.value, arg.sign) for arg in command.arguments])
+                                    for command in commands]))
+
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def find_intrinsics(commands: dict, stack) -> None:
+    # adds the std functions of a file that was just loaded to `stack.intrinsics`. it runs before the file is optimised
+    # and resolved, so the commands are as they were written and only the parameters are in the symbols of a function
+    for scope, function in commands.items():
+        if(not isinstance(scope, int)):
+            continue
+
+        name = stack.stack_funcs[scope]
+        intrinsic = INTRINSICS.get(name)
+
+        if(intrinsic is not None and fingerprint(name, list(stack.get_symbols(scope)), function) == intrinsic.digest):
+            stack.intrinsics[scope] = name
+
+
+# the commands the std functions are made of, on values instead of variables
+
+def compare(a, b) -> int:
+    # `%`
+    try:
+        if(a == b):
+            return 0
+        elif(a > b):
+            return 1
+
+        return -1
+    except TypeError:
+        return -1
+
+
+def invert(type: int, value) -> Any:
+    # `!`
+    if(type == Types.KW_STRING):
+        return value.upper()
+    elif(type == Types.KW_BOOL):
+        return ~value
+
+    return value * -1
+
+
+def is_number(var) -> bool:
+    return var.type == Types.KW_NUMBER
+
+
+def is_string(var) -> bool:
+    return var.type == Types.KW_STRING
+
+
+def is_int(var) -> bool:
+    # slicing a string with a float is an error
+    return var.type == Types.KW_NUMBER and var.value.__class__ is int
+
+
+def count_down(value) -> int:
+    # how many times `+(b, -1)` runs before `b` is 0, or -1 if it never is
+    if(value.__class__ is float and (not value.is_integer() or value > EXACT_FLOAT)):
+        return -1
+
+    return int(value) if value >= 0 else -1
+
+
+# the std functions on values, for the ones that are used by others
+
+def gt_value(a, b) -> int:
+    return max(0, min(compare(a, b), 1))
+
+
+def lt_value(a, b) -> int:
+    # `not` is given 0, 1 or 2
+    return 0 if compare(a, b) + 1 else 1
+
+
+def abs_value(type: int, value) -> Any:
+    return value if gt_value(value, 0) else invert(type, value)
+
+
+def mult_value(a, b) -> Any:
+    # `lt` and `abs` dont get their own `c`, since `mult` already has one. they all use that one, so the loop starts from
+    # what `gt` leaves in it (1 if `b` is positive). the loop runs at least once, and only ends once `b` is exactly 0
+    aisneg = lt_value(a, 0)
+    bisneg = lt_value(b, 0)
+
+    c = gt_value(b, 0)
+    a = abs_value(Types.KW_NUMBER, a)
+    count = count_down(abs_value(Types.KW_NUMBER, b))
+
+    if(count < 1):
+        return NOT_NATIVE
+
+    if(a.__class__ is int):
+        c = c + a * count
+    elif(count > LOOP_LIMIT):
+        return NOT_NATIVE
+    else:
+        for _ in range(count):
+            c = c + a
+
+    if(aisneg):
+        c = c * -1
+
+    if(bisneg):
+        c = c * -1
+
+    return c
+
+
+# the native functions
+
+def native_not(a) -> Any:
+    return 0 if a.value else 1
+
+
+def native_and(a, b) -> Any:
+    return max(0, min((1 if a.value else 0) + (1 if b.value else 0) - 1, 1))
+
+
+def native_or(a, b) -> Any:
+    return max(0, min((1 if a.value else 0) + (1 if b.value else 0), 1))
+
+
+def native_gt(a, b) -> Any:
+    return gt_value(a.value, b.value)
+
+
+def native_lt(a, b) -> Any:
+    return lt_value(a.value, b.value)
+
+
+def native_eq(a, b) -> Any:
+    return 1 if compare(a.value, b.value) == 0 else 0
+
+
+def native_num_to_bool(a) -> Any:
+    if(is_number(a)):
+        return Bool(bool(max(0, min(a.value, 1))))
+    elif(is_string(a)):
+        return Bool(bool(a.value[0:1]))
+
+    # `@` is skipped
+    return NOT_NATIVE
+
+
+def native_str_to_bool(a) -> Any:
+    if(not is_string(a)):
+        # `.` is skipped
+        return NOT_NATIVE
+
+    return Bool(a.value.lower() == "true")
+
+
+def native_is_dec(a) -> Any:
+    # `trunc` uses the `c` of `is_dec`, which is a number, so it always gives 0
+    if(not is_number(a)):
+        return NOT_NATIVE
+
+    return lt_value(0, a.value)
+
+
+def native_len(string) -> Any:
+    if(not is_string(string)):
+        # clamping a number instead of slicing a string, which can loop forever
+        return NOT_NATIVE
+
+    return len(string.value)
+
+
+def native_indexof(string, tchr, index) -> Any:
+    # the `index`th time (from 0) `tchr` is found, or the last time if it is found fewer times than that. the search
+    # starts again one character after each match, so matches can overlap
+    if(not is_string(string) or not is_string(tchr)):
+        return NOT_NATIVE
+
+    string = string.value
+    tchr = tchr.value
+
+    if(tchr == ""):
+        return -1
+
+    findex = -1
+    count = -1
+    found = string.find(tchr)
+
+    while(found != -1):
+        findex = found
+        count += 1
+
+        if(compare(count, index.value) == 0):
+            break
+
+        found = string.find(tchr, found + 1)
+
+    return findex
+
+
+def native_insert(string, chr, index) -> Any:
+    if(not is_string(string) or not is_string(chr) or not is_int(index)):
+        return NOT_NATIVE
+
+    total = len(string.value) + len(chr.value)
+
+    return string.value[0:index.value] + chr.value + string.value[index.value:total]
+
+
+def native_char_at(string, index) -> Any:
+    if(not is_string(string) or not is_int(index)):
+        return NOT_NATIVE
+
+    return string.value[index.value:index.value + 1]
+
+
+def native_abs(a) -> Any:
+    return abs_value(a.type, a.value)
+
+
+def native_trunc(a) -> Any:
+    # `indexof` is called without a variable for its result, so `point` stays 0 and the whole string is cut off. a number
+    # becomes 0 (the empty string isnt a number), and anything else is left as it was
+    if(not is_number(a)):
+        return a.value
+
+    # turning a very long int into a string is an error
+    str(a.value)
+
+    return 0
+
+
+def native_round(a) -> Any:
+    # `trunc` always gives 0, so this is 1 if the number is further than 0.4 from 0 (with the sign of the number), and 0
+    # otherwise
+    if(not is_number(a)):
+        return NOT_NATIVE
+
+    isneg = lt_value(a.value, 0)
+    diff = abs_value(Types.KW_NUMBER, a.value)
+
+    # `trunc`
+    str(diff)
+    truncated = 0
+
+    truncated = truncated * -1
+    diff = diff + truncated
+    truncated = truncated * -1
+
+    if(gt_value(diff, 0.4)):
+        truncated = truncated + 1
+
+    if(isneg):
+        truncated = truncated * -1
+
+    return truncated
+
+
+def native_mult(a, b) -> Any:
+    if(not is_number(a) or not is_number(b)):
+        return NOT_NATIVE
+
+    return mult_value(a.value, b.value)
+
+
+def native_pow(a, b) -> Any:
+    # `mult` uses the `c` of `pow` as well, which is what it is given anyway
+    if(not is_number(a) or not is_number(b)):
+        return NOT_NATIVE
+
+    count = count_down(b.value)
+
+    if(count < 0 or count > LOOP_LIMIT):
+        return NOT_NATIVE
+
+    c = 1
+
+    for _ in range(count):
+        c = mult_value(a.value, c)
+
+        if(c is NOT_NATIVE):
+            return NOT_NATIVE
+
+    return c
+
+
+# name -> (native function, the names it declares, the functions it calls, whether it can run in strict mode, digest)
+STD = {
+    "not": (native_not, ["c"], [], True, "da4e5015b688db5e7d95677e4b1d7ff9"),
+    "and": (native_and, ["c"], [], True, "ce8da475b8ad83b04ad2e1d2c4553bc4"),
+    "or": (native_or, ["c"], [], True, "a30582c768ef5b685cd30ed0ee125d4f"),
+    "gt": (native_gt, ["c"], [], True, "e0b18c34d9735dcb6e7c59d47a452e95"),
+    "lt": (native_lt, ["c"], ["not"], False, "daf8aa0f54ca9279d4e09fe6b651607d"),
+    "eq": (native_eq, ["c"], ["abs", "not"], False, "4c0c2ad508b6f541ce0f09855ae425e9"),
+    "num_to_bool": (native_num_to_bool, ["b"], [], True, "ec8a213aa1b3b1bae3fcc548b1a9d6b0"),
+    "str_to_bool": (native_str_to_bool, ["b", "t", "c"], [], True, "425787f0dfb328f24f47ba26256690ed"),
+    "is_dec": (native_is_dec, ["c", "truncated"], ["trunc", "lt"], False, "4917dee459e341171317a1d9ca393c18"),
+    "len": (native_len, ["e", "curri", "previ", "bckp"], [], True, "da8566fe4e38057fc6aff90bea264a8c"),
+    "indexof": (native_indexof, ["e", "count", "findex", "lengthh", "previ", "curri", "bckp"], ["len", "eq"], False, "ac4152abe09cf60bc0b3abc0c010fb32"),
+    "insert": (native_insert, ["lengthh", "total", "string2", "new"], ["len"], True, "3a773f942cdd6a0fec4d357f682a2ce2"),
+    "char_at": (native_char_at, ["lengthh", "before"], ["len"], True, "3fc908d4e9c70450dc2df54bc2e00826"),
+    "abs": (native_abs, ["c"], ["gt"], False, "dad82b3ce0d6eb5859c22c882b6bb1a8"),
+    "trunc": (native_trunc, ["c", "point"], ["indexof"], False, "9063f895dd84574879b38033253831dd"),
+    "round": (native_round, ["e", "isneg", "truncated", "diff"], ["lt", "abs", "trunc", "gt"], False, "bb2dd413b9f6531c79aa6c56ddd6b885"),
+    "mult": (native_mult, ["aisneg", "bisneg", "c"], ["lt", "abs"], False, "84904fac7afcfa92763ec03a5fa76185"),
+    "pow": (native_pow, ["c"], ["mult"], False, "7095f610ce388831a293e7a19c4a7e38"),
+}
+
+
+def make_intrinsic(name: str) -> Intrinsic:
+    function, names, calls, strict, digest = STD[name]
+
+    names = set(names)
+    depth = 0
+
+    for call in calls:
+        callee = make_intrinsic(call)
+
+        names |= callee.names
+        depth = max(depth, callee.depth)
+
+    calls = set(calls).union(*(make_intrinsic(call).calls for call in calls))
+
+    return Intrinsic(name, function, frozenset(names), frozenset(calls), depth + 1, strict, digest)
+
+
+INTRINSICS = {name: make_intrinsic(name) for name in STD}
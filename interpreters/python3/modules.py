@@ -0,0 +1,100 @@
+from dataclasses import dataclass, field
+from typing import Union
+from pathlib import Path
+import threading
+import os
+
+from constants import OPCODES, Types
+
+__all__ = ["Module", "Modules", "MODULES", "find_module", "find_imports"]
+
+IMPORT = OPCODES["~"]
+
+
+@dataclass
+class Module():
+    # an imported file as it was loaded, with its functions numbered from 0. every import of the file shares it, and moves
+    # the functions along to wherever the stack is up to (see `Interpreter.load_import`), so nothing in it is changed
+    # once it is loaded, apart from the functions in `bodies` being loaded the first time they are called (see
+    # `load_function` in `interpreter.py`)
+    file: Path
+    # of the file when it was loaded, it is loaded again if they change
+    mtime: int
+    size: int
+    functions: list
+    symbols: dict
+    intrinsics: dict
+    commands: dict
+    # the files it imports with a literal path, see `find_imports`
+    imports: list
+    # the text of the file, and index -> (start, end) in it of the commands of every function that hasnt been loaded yet
+    text: Union[str, None] = None
+    bodies: dict = field(default_factory=dict)
+    # held while a function is loaded, since runs on other threads can share the module
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+
+def find_module(path: str, folder: Path = None) -> Path:
+    # the canonical path of the file `~` imports. a relative path is found from `folder`, the folder of the file the `~`
+    # is in, and then from the working directory, which is where programs written for the node interpreter have it
+    file = Path(path)
+
+    if(folder is not None and not file.is_absolute() and (folder / file).exists()):
+        file = folder / file
+
+    return file.resolve()
+
+
+def find_imports(commands: dict) -> list:
+    # the files that `commands` import with a literal path. the others are only known when they run
+    files = []
+
+    for function in commands.values():
+        for command in function:
+            if(command.op == IMPORT and command.arguments[0].type == Types.LT_STRING):
+                file = find_module(command.arguments[0].value, command.folder)
+
+                if(file not in files):
+                    files.append(file)
+
+    return files
+
+
+class Modules():
+    # every file that has been imported in this process, so each one is only loaded once however many programs and runs
+    # import it. a file is loaded differently in strict mode and at each optimisation level, so they are kept apart
+    def __init__(self) -> None:
+        # (file, strict, level) -> `Module`
+        self.modules = {}
+
+    def get(self, file: Path, strict: bool, level: int) -> Union[Module, None]:
+        # the module for `file`, or `None` if it hasnt been loaded or the file has changed since
+        module = self.modules.get((file, strict, level))
+
+        if(module is None):
+            return None
+
+        try:
+            stat = file.stat()
+        except OSError:
+            return None
+
+        if(stat.st_mtime_ns != module.mtime or stat.st_size != module.size):
+            return None
+
+        return module
+
+    def add(self, file: Path, stat: os.stat_result, data: tuple, strict: bool, level: int) -> Module:
+        # `data` is what the cache keeps for the file, and `stat` should be taken before the file was read
+        functions, symbols, intrinsics, commands, text, bodies = data
+
+        # the imports of the functions that havent been loaded yet are only found when they are
+        module = Module(file, stat.st_mtime_ns, stat.st_size, functions, symbols, intrinsics, commands, find_imports(commands),
+                        text, bodies)
+        self.modules[(file, strict, level)] = module
+
+        return module
+
+
+# shared by every interpreter that isnt given its own
+MODULES = Modules()
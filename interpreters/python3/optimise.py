@@ -0,0 +1,258 @@
+from dataclasses import replace
+
+from constants import BLOCK, BUILD, COMPARE, OPCODES, SKIP, Types
+
+__all__ = ["optimise", "unfuse", "OPTIMISE_LEVELS"]
+
+# 0 runs the program exactly as it was written, 1 runs it through `optimise` first
+OPTIMISE_LEVELS = [0, 1]
+
+ADD = OPCODES["+"]
+COMPARE_NUM = OPCODES["%"]
+CLAMP = OPCODES["@"]
+SET_NUM = OPCODES["="]
+SET_STR = OPCODES[":"]
+CONCAT = OPCODES["&"]
+GOTO = OPCODES["#"]
+BRANCH = OPCODES["?"]
+CALL = OPCODES["|"]
+
+JUMPS = (GOTO, BRANCH)
+
+# commands that can end a `BLOCK`
+ENDS = (GOTO, BRANCH, COMPARE)
+
+# commands `fold` can join together
+FOLDED = (ADD, SET_NUM, SET_STR, CONCAT)
+
+# commands that only change variables, so any number of them can run one after the other without going back to the
+# loop. `$` is left out since `Interpreter.resolve` looks for declarations, and `~`, `/`, `\\`, `|` and `>` since they
+# need the loop (to run an import, move to another function or wait for input)
+STRAIGHT = {OPCODES[name] for name in ("+", "=", "%", ":", "&", "!", ".", "@", "\"", "1", "<")} | {BUILD}
+
+LITERALS = (Types.LT_NUMBER, Types.LT_STRING, Types.LT_BOOL)
+
+
+class Slot():
+    # a command of the optimised function, and the indexes of the commands it was made from. commands that were removed
+    # belong to the command after them, since that is where jumping to them ends up
+    __slots__ = ("command", "indexes", "entry")
+
+    def __init__(self, command, indexes: list, entry: bool) -> None:
+        self.command = command
+        self.indexes = indexes
+
+        # whether the pointer can arrive here from anywhere but the command before, in which case nothing can be merged
+        # into the command before
+        self.entry = entry
+
+
+def is_literal(arg) -> bool:
+    return arg.type in LITERALS
+
+
+def same_variable(command1, command2) -> bool:
+    # both commands change the same variable. a name always finds the same variable within a function, unless a `$` or
+    # a call comes in between, and neither of those are ever merged
+    arg1 = command1.arguments[0]
+    arg2 = command2.arguments[0]
+
+    return arg1.type == Types.VARIABLE and arg2.type == Types.VARIABLE and arg1.value == arg2.value
+
+
+def with_value(command, value):
+    # `command` with its second argument replaced by the literal `value`
+    literal = replace(command.arguments[1], type=Types.LT_STRING if isinstance(value, str) else Types.LT_NUMBER,
+                      value=value, sign="")
+
+    return replace(command, arguments=[command.arguments[0], literal])
+
+
+def fold(command1, command2):
+    # returns a single command that does the same as `command1` followed by `command2`, or `None` if there isnt one.
+    # only literals are folded, since looking up a variable can fail, and that has to happen just like it would have
+    op1 = command1.op
+    op2 = command2.op
+
+    # every one of these has been checked to have exactly two arguments by `verify`
+    if(op1 not in FOLDED or op2 not in FOLDED):
+        return None
+
+    if(not same_variable(command1, command2) or not is_literal(command2.arguments[1])):
+        return None
+
+    # setting a variable twice, the first value is never seen
+    if(op1 == op2 and op1 in (SET_NUM, SET_STR) and is_literal(command1.arguments[1])):
+        return command2
+
+    if(not is_literal(command1.arguments[1])):
+        return None
+
+    value1 = command1.arguments[1].value
+    value2 = command2.arguments[1].value
+
+    if(op1 == SET_NUM and op2 == ADD):
+        return with_value(command1, value1 + value2)
+
+    # `&` turns both sides into strings, so appending two literals is the same as appending them joined together.
+    # two `+`s are left alone since adding floats in a different order can give a different number
+    if(op1 in (SET_STR, CONCAT) and op2 == CONCAT):
+        return with_value(command1, (value1 if op1 == SET_STR else str(value1)) + str(value2))
+
+    return None
+
+
+def is_number(arg, value) -> bool:
+    return arg.type == Types.LT_NUMBER and arg.value == value
+
+
+def is_compare_branch(compare, clamp, branch) -> bool:
+    # `%(a, b, c)`, `@(c, 0, 1)` and `?(c, ...)`, the usual way to branch on whether `a` is greater than `b`
+    if(compare.op != COMPARE_NUM or clamp.op != CLAMP or branch.op != BRANCH):
+        return False
+
+    name = compare.arguments[2].value
+
+    return all(arg.type == Types.VARIABLE and arg.value == name for arg in (compare.arguments[2], clamp.arguments[0], branch.arguments[0])) \
+        and is_number(clamp.arguments[1], 0) and is_number(clamp.arguments[2], 1)
+
+
+def fuse(commands: list, op: int):
+    # one command that runs all of `commands`, see `Interpreter.exec_block` and `Interpreter.exec_build`
+    first = commands[0]
+
+    return replace(first, name="".join(command.name for command in commands), op=op,
+                   arguments=[arg for command in commands for arg in command.arguments], targets=None, tail=None,
+                   parts=commands, size=sum(command.size for command in commands))
+
+
+def unfuse(command) -> list:
+    # the commands that were written, in the order they run, that `command` was made from
+    if(command.parts is None):
+        return [command]
+
+    return [part for command in command.parts for part in unfuse(command)]
+
+
+def merge(slots: list, can_start, can_add, op: int) -> list:
+    # merges runs of slots where the first slot passes `can_start` and the ones after it pass `can_add` into a single
+    # command. a run is never merged past a slot the pointer can jump to
+    merged = []
+    index = 0
+
+    while(index < len(slots)):
+        slot = slots[index]
+        end = index + 1
+
+        if(can_start(slot.command)):
+            while(end < len(slots) and not slots[end].entry and can_add(slot.command, slots[end - 1].command, slots[end].command)):
+                end += 1
+
+        if(end - index > 1):
+            run = slots[index:end]
+            slot = Slot(fuse([part.command for part in run], op), [i for part in run for i in part.indexes], slot.entry)
+
+        merged.append(slot)
+        index = end
+
+    return merged
+
+
+def optimise_function(commands: list) -> list:
+    # where the pointer can end up other than by running the command before: the targets of jumps and the command
+    # after a call, which is where the call returns to
+    entries = {0, len(commands)}
+
+    for index, command in enumerate(commands):
+        if(command.targets is not None):
+            entries.update(target for target in command.targets if target is not None)
+        elif(command.op == CALL):
+            entries.add(index + 1)
+
+    slots = []
+    removed = []
+
+    for index, command in enumerate(commands):
+        # commands that do nothing: ones that could never run, and gotos to the next command
+        if(command.op == SKIP or (command.op == GOTO and command.targets[0] == index + 1)):
+            removed.append(index)
+            continue
+
+        indexes = removed + [index]
+        removed = []
+
+        slots.append(Slot(command, indexes, any(i in entries for i in indexes)))
+
+    # constants
+    folded = []
+
+    for slot in slots:
+        if(len(folded) > 0 and not slot.entry):
+            command = fold(folded[-1].command, slot.command)
+
+            if(command is not None):
+                command = replace(command, size=folded[-1].command.size + slot.command.size)
+                folded[-1] = Slot(command, folded[-1].indexes + slot.indexes, folded[-1].entry)
+                continue
+
+        folded.append(slot)
+
+    # compares that are branched on
+    slots = []
+
+    for slot in folded:
+        if(len(slots) > 1 and not slot.entry and not slots[-1].entry and is_compare_branch(slots[-2].command, slots[-1].command, slot.command)):
+            run = slots[-2:] + [slot]
+            slots[-2:] = [Slot(fuse([part.command for part in run], COMPARE), [i for part in run for i in part.indexes], run[0].entry)]
+            continue
+
+        slots.append(slot)
+
+    folded = slots
+
+    # a string that is set and then appended to, or just appended to, a few times in a row
+    slots = merge(folded,
+                  lambda command: command.op in (SET_STR, CONCAT),
+                  lambda first, last, command: command.op == CONCAT and same_variable(first, command),
+                  BUILD)
+
+    # straight runs of commands, which can end with a jump
+    slots = merge(slots,
+                  lambda command: command.op in STRAIGHT,
+                  lambda first, last, command: last.op in STRAIGHT and (command.op in STRAIGHT or command.op in ENDS),
+                  BLOCK)
+
+    # where each of the old indexes is now. the ones that were removed at the end go to the end
+    moved = {len(commands): len(slots)}
+
+    for new, slot in enumerate(slots):
+        for index in slot.indexes:
+            moved[index] = new
+
+    for index in removed:
+        moved[index] = len(slots)
+
+    commands = [slot.command for slot in slots]
+
+    while(len(commands) > 0):
+        command = commands.pop()
+
+        if(command.parts is not None):
+            commands.extend(command.parts)
+        elif(command.op in JUMPS):
+            command.targets = [moved[target] if target is not None else None for target in command.targets]
+
+    return [slot.command for slot in slots]
+
+
+def optimise(commands: dict) -> None:
+    # rewrites every function in place so it runs in fewer commands, but does exactly the same thing. it runs between
+    # `verify` and `Interpreter.resolve`, so the targets of jumps have already been worked out and are moved along with
+    # the commands they point at. a command that runs other commands is only ever one of:
+    # - `BUILD`: a run of `:` / `&` on the same string
+    # - `COMPARE`: `%`, `@` and `?`, the usual way to branch on a comparison
+    # - `BLOCK`: a run of commands that just change variables, the last of which can be a jump
+    # every command keeps count of how many it stands for (`Command.size`), which is what the steps of a quota count.
+    # the ones that were removed because they do nothing arent counted
+    for scope, function in commands.items():
+        commands[scope] = optimise_function(function)
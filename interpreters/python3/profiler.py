@@ -0,0 +1,137 @@
+from dataclasses import dataclass, asdict
+from typing import IO, Union
+from pathlib import Path
+import json
+import sys
+
+from hooks import Hook
+
+__all__ = ["Profiler"]
+
+# how many of the slowest commands are shown in the report
+REPORT_SIZE = 20
+
+
+@dataclass
+class CommandStats():
+    scope: str
+    index: int
+    name: str
+    line: int
+    column: int
+    count: int = 0
+    skips: int = 0
+    time: float = 0
+
+
+@dataclass
+class FunctionStats():
+    name: str
+    calls: int = 0
+    # time spent running commands from the call until its return, including everything the function called
+    time: float = 0
+
+
+class Profiler(Hook):
+    # records how often each command runs and how long it takes
+    def __init__(self) -> None:
+        # `id` of the command -> its stats
+        self.commands = {}
+        self.functions = {}
+
+        # time spent running commands so far. the time of a call is worked out from this instead of the clock, so the
+        # time spent in hooks isnt counted
+        self.time = 0
+
+        # the calls that havent returned yet, as (name, `time` when it was called)
+        self.calls = []
+
+        # the names of the calls on the stack -> time spent running commands there, for flame graphs
+        self.stacks = {}
+
+    def record(self, command, scope: str, index: int, elapsed: float) -> CommandStats:
+        stats = self.commands.get(id(command))
+
+        if(stats is None):
+            stats = self.commands[id(command)] = CommandStats(scope, index, command.name, command.line, command.column)
+
+        stats.count += 1
+        stats.time += elapsed
+
+        self.time += elapsed
+
+        stack = tuple(name for name, _ in self.calls)
+        self.stacks[stack] = self.stacks.get(stack, 0) + elapsed
+
+        return stats
+
+    def on_command(self, command, scope: str, index: int, elapsed: float) -> None:
+        self.record(command, scope, index, elapsed)
+
+    def on_skip(self, command, scope: str, index: int, elapsed: float) -> None:
+        self.record(command, scope, index, elapsed).skips += 1
+
+    def on_call(self, name: str, command) -> None:
+        self.calls.append((name, self.time))
+
+    def on_return(self, name: str, command) -> None:
+        if(len(self.calls) > 0):
+            self.end_call()
+
+    def end_call(self) -> None:
+        name, start = self.calls.pop()
+
+        stats = self.functions.get(name)
+
+        if(stats is None):
+            stats = self.functions[name] = FunctionStats(name)
+
+        stats.calls += 1
+        stats.time += self.time - start
+
+    def finish(self) -> None:
+        # the program stopped inside of a function (i.e. because of an error), so close the calls that never returned
+        while(len(self.calls) > 0):
+            self.end_call()
+
+    def report(self, file: IO = sys.stderr, size: int = REPORT_SIZE) -> None:
+        self.finish()
+
+        total = self.time or 1
+        commands = sorted(self.commands.values(), key=lambda stats: stats.time, reverse=True)
+
+        print(f"\nProfile: {sum(stats.count for stats in commands)} commands in {total * 1000:.2f}ms", file=file)
+        print(f"\n{'scope':<20}{'index':>6}{'command':>9}{'line':>8}{'count':>10}{'skips':>10}{'time':>12}{'%':>7}", file=file)
+
+        for stats in commands[:size]:
+            print(f"{stats.scope:<20}{stats.index:>6}{stats.name:>9}{stats.line:>8}{stats.count:>10}{stats.skips:>10}"
+                  f"{stats.time * 1000:>10.2f}ms{stats.time / total:>7.1%}", file=file)
+
+        if(len(self.functions) == 0):
+            return
+
+        print(f"\n{'function':<20}{'calls':>10}{'time':>12}{'per call':>12}", file=file)
+
+        for stats in sorted(self.functions.values(), key=lambda stats: stats.time, reverse=True):
+            print(f"{stats.name:<20}{stats.calls:>10}{stats.time * 1000:>10.2f}ms{stats.time / stats.calls * 1000:>10.3f}ms",
+                  file=file)
+
+    def to_json(self) -> dict:
+        self.finish()
+
+        return {
+            "time": self.time,
+            "commands": [asdict(stats) for stats in self.commands.values()],
+            "functions": [asdict(stats) for stats in self.functions.values()],
+        }
+
+    def write_json(self, file: Union[Path, str]) -> None:
+        with open(file, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=4)
+
+    def write_folded(self, file: Union[Path, str]) -> None:
+        # one line per call stack with the time spent in it in microseconds, which is what `flamegraph.pl`, speedscope
+        # and most other flame graph tools read
+        with open(file, "w", encoding="utf-8") as f:
+            for stack, time in self.stacks.items():
+                f.write(";".join(("global",) + stack) + f" {round(time * 1e6)}\n")
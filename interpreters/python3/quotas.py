@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Union
+
+__all__ = ["Quota"]
+
+# how many commands run between checks of the clock and the size of the strings, see `Interpreter.step`
+CHECK_EVERY = 4096
+
+
+@dataclass
+class Quota():
+    # limits on a single run, `None` for no limit. a run that goes over one is stopped with a `QuotaExceededError`
+
+    # the most commands that can run
+    steps: Union[int, None] = None
+    # seconds the run can take, by the wall clock (so it includes waiting for input)
+    time: Union[float, None] = None
+    # the most calls that can be unfinished at once
+    depth: Union[int, None] = None
+    # the most characters all of the string variables can hold together
+    strings: Union[int, None] = None
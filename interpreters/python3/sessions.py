@@ -0,0 +1,101 @@
+from typing import Union
+import asyncio
+import time
+import io
+
+from interpreter import Interpreter, DONE, WAITING
+from streams import OutputSink, QueueInput
+from errors import QuotaExceededError
+
+__all__ = ["Session", "run_session"]
+
+# how many commands a session runs before letting the other sessions on the event loop have a turn
+SLICE = 1000
+
+
+class Session():
+    # runs a program on an asyncio event loop, `slice` commands at a time, so one loop can run any number of them side by
+    # side. `<` writes to `writer` and `>` reads a line from `reader` (i.e. the `asyncio.StreamReader` / `StreamWriter` of
+    # a connection), and the session only waits for a line when the program asks for one. every session needs its own
+    # interpreter, `Interpreter.clone` gives one the program another has already loaded
+    def __init__(self, interp: Interpreter, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, slice: int = SLICE,
+                 prompt: Union[str, None] = None) -> None:
+        self.interp = interp
+        self.reader = reader
+        self.writer = writer
+        self.slice = slice
+
+        # written before waiting for a line
+        self.prompt = prompt
+
+        self.buffer = io.StringIO()
+        self.output = OutputSink(self.buffer, "end")
+        self.input = QueueInput()
+
+    async def drain(self) -> None:
+        # sends what the program has output so far
+        self.output.flush()
+
+        text = self.buffer.getvalue()
+
+        if(text == ""):
+            return
+
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+        self.writer.write(text.encode("utf-8"))
+        await self.writer.drain()
+
+    async def read_line(self) -> None:
+        if(self.prompt is not None):
+            self.writer.write(self.prompt.encode("utf-8"))
+            await self.writer.drain()
+
+        timeout = None
+
+        if(self.interp.deadline is not None):
+            # the rest of the quota is checked by `step`, but that doesnt run while waiting
+            timeout = max(0, self.interp.deadline - time.monotonic())
+
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), timeout)
+        except asyncio.TimeoutError:
+            raise QuotaExceededError("time", self.interp.quota.time)
+
+        if(line == b""):
+            # the other end has closed, so `>` is skipped from now on like it is when batch input runs out
+            self.input.close()
+        else:
+            self.input.feed(line.decode("utf-8").rstrip("\r\n"))
+
+    async def run(self, source=None) -> None:
+        # `source` is loaded first if it is given, see `Interpreter.start`. waiting for the interpreter would block the
+        # whole event loop, so an interpreter that is already running is an error
+        self.interp.start(source, self.input, self.output, wait=False)
+
+        try:
+            while(True):
+                state = self.interp.step(self.slice)
+
+                await self.drain()
+
+                if(state == DONE):
+                    break
+
+                if(state == WAITING):
+                    await self.read_line()
+                else:
+                    # let the other sessions run
+                    await asyncio.sleep(0)
+        finally:
+            self.interp.stop()
+
+            # what the program output before it stopped, even if it stopped because of an error or its quota
+            await self.drain()
+
+
+async def run_session(source, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, strict: bool = False,
+                      slice: int = SLICE) -> None:
+    # runs `source` (see `tokenise`) in a new interpreter
+    await Session(Interpreter(strict=strict), reader, writer, slice).run(source)
@@ -0,0 +1,187 @@
+from typing import IO, Union
+from pathlib import Path
+import codecs
+import sys
+import os
+import re
+
+__all__ = ["InputPending", "InputSource", "OutputSink", "QueueInput", "unescape"]
+
+# how much output is kept before it is written with the `size` flush policy
+BUFFER_SIZE = 1 << 16
+
+# line: write every line as soon as it is output (what you want when someone is watching)
+# size: write once `size` characters have been output
+# end: only write when the program finishes, or when it asks for input
+FLUSH_POLICIES = ["line", "size", "end"]
+
+# what is shown when asking for input interactively
+PROMPT = ">: "
+
+# the escapes that python's `unicode-escape` understands. anything else is left as it is
+ESCAPE = re.compile(r'\\(?:[\\\'"abfnrtv\n]|[0-7]{1,3}|x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]+\})')
+
+
+def unescape_match(match: re.Match) -> str:
+    try:
+        return codecs.decode(match.group(0), "unicode-escape")
+    except UnicodeDecodeError:
+        # i.e. `\U` past the last character, it's just text then
+        return match.group(0)
+
+
+def unescape(text: str) -> str:
+    # turns `\n` and friends into the characters they stand for. only the escapes themselves are decoded, so the rest of
+    # the text (i.e. non ascii characters) is left alone
+    if("\\" not in text):
+        return text
+
+    return ESCAPE.sub(unescape_match, text)
+
+
+class OutputSink():
+    # where `<` writes to. output is kept in a buffer and written to `target` in blocks, depending on the flush policy.
+    # `target` is a stream (`sys.stdout` if it is `None`, or i.e. an `io.StringIO` to keep the output in memory) or the
+    # path of a file to write to
+    def __init__(self, target: Union[IO, Path, str, None] = None, flush: Union[str, None] = None, size: int = BUFFER_SIZE) -> None:
+        self.owned = False
+
+        if(target is None):
+            target = sys.stdout
+        elif(isinstance(target, (str, os.PathLike))):
+            target = open(target, "w", encoding="utf-8")
+            self.owned = True
+
+        self.stream = target
+
+        if(flush is None):
+            # a terminal gets every line straight away, anything else gets blocks
+            flush = "line" if self.isatty() else "size"
+
+        if(flush not in FLUSH_POLICIES):
+            raise ValueError(f"Unknown flush policy `{flush}`.")
+
+        self.flush_policy = flush
+
+        # number of characters that can be buffered before they are written, `None` for no limit
+        self.limit = 0 if flush == "line" else size if flush == "size" else None
+
+        self.buffer = []
+        self.buffered = 0
+
+    def isatty(self) -> bool:
+        try:
+            return self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def write_line(self, text: str) -> None:
+        self.buffer.append(text)
+
+        if(self.limit is None):
+            return
+
+        self.buffered += len(text) + 1
+
+        if(self.buffered > self.limit):
+            self.flush()
+
+    def flush(self) -> None:
+        if(len(self.buffer) > 0):
+            self.buffer.append("")
+            self.stream.write("\n".join(self.buffer))
+
+            self.buffer = []
+            self.buffered = 0
+
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+        if(self.owned):
+            self.stream.close()
+
+
+class InputSource():
+    # where `>` reads from. with no `source` every line is asked for interactively, with a prompt. otherwise the lines are
+    # given up front (batch mode): `source` is a list of values, the path of a file or a stream (i.e. `sys.stdin`), which
+    # is read all at once the first time input is needed, and there are no prompts
+    def __init__(self, source: Union[list, IO, Path, str, None] = None, prompt: str = PROMPT) -> None:
+        self.source = source
+        self.lines = None
+        self.index = 0
+
+        if(source is None):
+            self.prompt = prompt
+        else:
+            self.prompt = None
+
+            if(isinstance(source, (list, tuple))):
+                self.lines = [str(value) for value in source]
+
+    def is_interactive(self) -> bool:
+        return self.source is None
+
+    def load(self) -> None:
+        if(isinstance(self.source, (str, os.PathLike))):
+            with open(self.source, "r", encoding="utf-8") as f:
+                text = f.read()
+        else:
+            text = self.source.read()
+
+            if(isinstance(text, bytes)):
+                text = text.decode("utf-8")
+
+        self.lines = text.split("\n")
+
+        # a newline at the end of the last line doesnt start another one
+        if(self.lines[-1] == ""):
+            self.lines.pop()
+
+    def read_line(self) -> Union[str, None]:
+        # returns `None` once all the input given up front has been used
+        if(self.source is None):
+            return input(self.prompt)
+
+        if(self.lines is None):
+            self.load()
+
+        if(self.index >= len(self.lines)):
+            return None
+
+        self.index += 1
+
+        return self.lines[self.index - 1]
+
+
+class InputPending(Exception):
+    # raised by `QueueInput.read_line` when the next line hasnt been given yet, see `Interpreter.step`
+    pass
+
+
+class QueueInput(InputSource):
+    # where `>` reads from when the lines arrive while the program runs (i.e. from an async stream, see `sessions.py`).
+    # lines are added with `feed`, and `close` marks the end of the input. asking for a line that hasnt arrived yet raises
+    # `InputPending`, so the program can be paused until it does
+    def __init__(self) -> None:
+        super().__init__([])
+
+        self.closed = False
+
+    def feed(self, text: str) -> None:
+        self.lines.append(text)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def read_line(self) -> Union[str, None]:
+        if(self.index < len(self.lines)):
+            self.index += 1
+
+            return self.lines[self.index - 1]
+
+        if(self.closed):
+            return None
+
+        raise InputPending
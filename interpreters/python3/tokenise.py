@@ -1,125 +1,316 @@
-from pathlib import Path
-from dataclasses import dataclass
-
-from constants import COMMANDS, Types
-
-__all__ = ["tokenize"]
-
-
-class CONTEXTS:
-    OUT = "out"
-    IN = "in"
-    STR = "str"
-
-
-@dataclass(frozen=True, repr=False)
-class Token():
-    type: str
-    value: str
-
-
-def tokenise(file: Path) -> list[Token]:
-    CONTEXT = CONTEXTS.OUT
-
-    tokens = []
-
-    var_name = ""
-    string = ""
-
-    def add_token(char: str, type: str) -> None:
-        tokens.append(Token(
-            type, char
-        ))
-
-    # is separate because it's used twice and is messy to check if it is a signed number
-    def add_arg(val: str):
-        try:
-            # check if it is a number
-            num = float(val)
-
-            # now check if it had a sign
-            if(val.find("+") > -1):
-                # the + or - at the end denotes the sign
-                add_token(num, Types.LT_NUMBER_P)
-            elif(val.find("-") > -1):
-                add_token(num, Types.LT_NUMBER_N)
-            else:
-                add_token(num, Types.LT_NUMBER)
-
-        except ValueError:
-            if(val == "bool"):
-                add_token(val, Types.KW_BOOL)
-            elif(val == "str"):
-                add_token(val, Types.KW_STRING)
-            elif(val == "num"):
-                add_token(val, Types.KW_NUMBER)
-            elif(val in ["false", "true"]):
-                add_token(val, Types.LT_BOOL)
-            else:
-                add_token(val, Types.VARIABLE)
-
-    with open(file, "r") as f:
-        for line in f:
-            for char_index, char in enumerate(line):
-
-                next = "" if(char_index + 1 >= len(line)
-                             ) else line[char_index + 1]
-                prev = line[char_index - 1]
-
-                # ignore if the character is whitespace dont ignore if it is in a string
-                if(char.isspace() and CONTEXT != CONTEXTS.STR):
-                    continue
-
-                # checks if the character is a valid command. only adds it if it is followed by a bracket
-                elif(char in COMMANDS and next == "(" and CONTEXT == CONTEXTS.OUT):
-                    add_token(char, "COMMAND")
-
-                # check if its an opening bracket but also if the previous character was a command otherwise it will ignore it
-                    # i.e `#()` is valid but `()` is not
-                elif(char == "(" and prev in COMMANDS and CONTEXT == CONTEXTS.OUT):
-                    CONTEXT = CONTEXTS.IN
-
-                    add_token(char, "L_BRACK")
-
-                elif(char == ")" and CONTEXT == CONTEXTS.IN):
-                    CONTEXT = CONTEXTS.OUT
-
-                    # when we are about to leave the context, if there was an argument left over add it and clear the name
-                    if(var_name != ""):
-                        add_arg(var_name)
-                        var_name = ""
-
-                    add_token(char, "R_BRACK")
-
-                elif(char == "\""):
-                    if(CONTEXT == CONTEXTS.STR):
-                        CONTEXT = CONTEXTS.IN
-
-                        add_token(string, Types.LT_STRING)
-                        add_token(char, "STR_END")
-
-                        string = ""
-                    else:
-                        CONTEXT = CONTEXTS.STR
-
-                        add_token(char, "STR_START")
-
-                # if we are in the middle of a string i.e. after the first ", concat all characters together
-                elif(CONTEXT == CONTEXTS.STR):
-                    string = string + char
-
-                # this will add all the arguments of the funtion since the context is `in` after and open bracket
-                elif(CONTEXT == CONTEXTS.IN):
-                    if(char != ","):
-                        # concat all the characters together into cohesive name
-                        var_name = var_name + char
-                    else:
-                        if(var_name != ""):
-                            add_arg(var_name)
-
-                        # wipe the argument name once we hit a separator
-                        var_name = ""
-
-    add_token("EOF", "EOF")
-
-    return tokens
+from typing import Iterator, NamedTuple, Union, IO
+from pathlib import Path
+import codecs
+import os
+import re
+
+from constants import COMMANDS, Types
+
+__all__ = ["tokenise", "tokenise_part", "find_functions", "Token"]
+
+# files and streams are read this many characters at a time, so tokens can be used before the whole file has been read
+CHUNK_SIZE = 1 << 16
+
+# a command is only a command if it is immediately followed by a bracket, anything else outside of a command is a comment
+COMMAND = re.compile("[" + re.escape("".join(COMMANDS)) + r"]\(")
+
+# one piece of a command's arguments: a string (the closing quote might be missing at the end of the file), a separator,
+# the closing bracket, or a run of characters that are part of an argument. whitespace between them is ignored, so
+# `my variable` is the same as `myvariable`
+ARGUMENT = re.compile(r'\s*(?:"([^"]*)("?)|([,)])|([^\s,)"]+))')
+
+# the arguments of a command with no strings in it, which is most of them
+SIMPLE_ARGUMENTS = re.compile(r'[^")]*\)')
+
+# the arguments of any command, up to its closing bracket
+SKIP_ARGUMENTS = re.compile(r'(?:[^")]+|"[^"]*")*')
+
+# anything `float` accepts starts with one of these (including `nan`, `inf` and `infinity`)
+NUMBER_START = set("0123456789+-.nNiI")
+
+KEYWORDS = {
+    "bool": Types.KW_BOOL,
+    "str": Types.KW_STRING,
+    "num": Types.KW_NUMBER,
+    "false": Types.LT_BOOL,
+    "true": Types.LT_BOOL,
+}
+
+
+class Token(NamedTuple):
+    type: str
+    value: str
+    line: int = 0
+    column: int = 0
+
+
+def get_arg_token(val: str) -> tuple:
+    # only try to convert it if it could be a number, raising `ValueError` for every name is slow
+    if(val[0] not in NUMBER_START):
+        return KEYWORDS.get(val, Types.VARIABLE), val
+
+    try:
+        # check if it is a number
+        num = float(val)
+    except ValueError:
+        return KEYWORDS.get(val, Types.VARIABLE), val
+
+    # now check if it had a sign
+    if("+" in val):
+        return Types.LT_NUMBER_P, num
+    elif("-" in val):
+        return Types.LT_NUMBER_N, num
+
+    return Types.LT_NUMBER, num
+
+
+def scan_simple_command(text: str, pos: int, end: int) -> tuple:
+    # same as `scan_command`, for a command without strings that ends with the bracket at `end - 1`
+    tokens = []
+
+    for arg in text[pos:end - 1].split(","):
+        value = "".join(arg.split())
+
+        if(value != ""):
+            type, value = get_arg_token(value)
+            tokens.append((type, value, pos + len(arg) - len(arg.lstrip())))
+
+        pos += len(arg) + 1
+
+    tokens.append(("R_BRACK", ")", end - 1))
+
+    return tokens, end
+
+
+def scan_command(text: str, pos: int, final: bool) -> Union[tuple, None]:
+    # scans the arguments of a command starting just after its opening bracket. returns the tokens as
+    # (type, value, position) and where the command ends, or `None` if the command carries on past the end of `text`
+    simple = SIMPLE_ARGUMENTS.match(text, pos)
+
+    if(simple is not None):
+        return scan_simple_command(text, pos, simple.end())
+
+    tokens = []
+
+    arg = ""
+    arg_pos = pos
+
+    while(True):
+        match = ARGUMENT.match(text, pos)
+
+        if(match is None or (not final and match.end() == len(text) and match.group(3) != ")")):
+            # the last piece might carry on in the next chunk
+            if(not final):
+                return None
+
+            # a command that is never closed just stops at the end of the file
+            return tokens, len(text)
+
+        string, closed, separator, piece = match.groups()
+        start = match.end() - len(match.group(0).lstrip())
+
+        if(piece is not None):
+            if(arg == ""):
+                arg_pos = start
+
+            # concat all the pieces together into cohesive name
+            arg += piece
+
+        elif(string is not None):
+            if(not closed):
+                # an unterminated string swallows the rest of the file
+                return tokens, len(text)
+
+            tokens.append((Types.LT_STRING, string, start + 1))
+
+        else:
+            # when we hit a separator or the closing bracket, if there was an argument add it and clear the name
+            if(arg != ""):
+                type, value = get_arg_token(arg)
+                tokens.append((type, value, arg_pos))
+
+                arg = ""
+
+            if(separator == ")"):
+                tokens.append(("R_BRACK", ")", start))
+
+                return tokens, match.end()
+
+        pos = match.end()
+
+
+def read_chunks(source) -> Iterator[str]:
+    if(isinstance(source, str)):
+        yield source
+        return
+
+    if(isinstance(source, (bytes, bytearray))):
+        yield source.decode("utf-8")
+        return
+
+    if(isinstance(source, (Path, os.PathLike))):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from read_chunks(f)
+
+        return
+
+    # a text or binary stream
+    decoder = None
+
+    while(True):
+        chunk = source.read(CHUNK_SIZE)
+
+        if(not chunk):
+            break
+
+        if(isinstance(chunk, bytes)):
+            if(decoder is None):
+                decoder = codecs.getincrementaldecoder("utf-8")()
+
+            chunk = decoder.decode(chunk)
+
+        yield chunk
+
+    if(decoder is not None):
+        yield decoder.decode(b"", True)
+
+
+def find_functions(text: str) -> Union[list, None]:
+    # finds the functions declared in `text` without tokenising it, so their commands can be tokenised when they are
+    # needed (see `Interpreter.load_import`). returns (start, end, last) for every function in the order they are declared:
+    # where its first command starts (just after its `/`), and where its `\\` starts and ends. `None` if `text` has
+    # functions inside of functions or a `\\` outside of one, which only `Interpreter.interp` knows what to do with
+    functions = []
+    start = None
+    pos = 0
+
+    while(True):
+        match = COMMAND.search(text, pos)
+
+        if(match is None):
+            break
+
+        end = SKIP_ARGUMENTS.match(text, match.end()).end()
+
+        if(not text.startswith(")", end)):
+            # a command that is never closed (or a string that isnt) runs to the end of the file, and is left out
+            break
+
+        name = text[match.start()]
+        pos = end + 1
+
+        if(name == "/"):
+            tokens, _ = scan_command(text, match.end(), True)
+
+            if(not Types.eq(tokens[0][0], Types.VARIABLE)):
+                # not a function
+                continue
+
+            if(start is not None):
+                return None
+
+            start = pos
+
+        elif(name == "\\"):
+            if(start is None):
+                return None
+
+            functions.append((start, match.start(), pos))
+            start = None
+
+    if(start is not None):
+        # the last function carries on to the end of the file
+        functions.append((start, len(text), len(text)))
+
+    return functions
+
+
+def tokenise_part(text: str, start: int, end: int) -> Iterator[Token]:
+    # the tokens of `text[start:end]`, with the lines and columns they have in the whole of `text`
+    line = text.count("\n", 0, start) + 1
+    column = start - text.rfind("\n", 0, start)
+
+    return tokenise(text[start:end], line, column)
+
+
+def tokenise(source: Union[Path, str, bytes, IO], line: int = 1, column: int = 1) -> Iterator[Token]:
+    # `source` is a path to a file, the code itself (`str` / `bytes`), or a stream to read the code from.
+    # tokens are yielded as soon as each command has been scanned. `line` and `column` are where `source` starts, if it
+    # is part of a file
+    buffer = ""
+
+    # absolute position of the start of `buffer`
+    offset = 0
+
+    # line tracking, all absolute positions
+    line_start = 1 - column
+    counted = 0
+
+    def position(pos: int) -> tuple:
+        nonlocal line, line_start, counted
+
+        # `pos` is relative to the buffer, and never goes backwards
+        start = counted - offset
+        newlines = buffer.count("\n", start, pos)
+
+        if(newlines):
+            line += newlines
+            line_start = offset + buffer.rfind("\n", start, pos) + 1
+
+        counted = offset + pos
+
+        return line, offset + pos - line_start + 1
+
+    chunks = read_chunks(source)
+    final = False
+
+    while(not final):
+        chunk = next(chunks, None)
+
+        if(chunk is None):
+            final = True
+        else:
+            buffer += chunk
+
+        pos = 0
+
+        while(True):
+            match = COMMAND.search(buffer, pos)
+
+            if(match is None):
+                # keep the last character, it could be a command that is followed by a bracket in the next chunk
+                pos = len(buffer) if final else max(pos, len(buffer) - 1)
+                break
+
+            scanned = scan_command(buffer, match.end(), final)
+
+            if(scanned is None):
+                # wait for the rest of the command
+                pos = match.start()
+                break
+
+            tokens, end = scanned
+            start = match.start()
+
+            line, column = position(start)
+
+            yield Token("COMMAND", buffer[start], line, column)
+
+            if(buffer.find("\n", start, end) == -1):
+                # all on one line, which is most of the time
+                for type, value, pos in tokens:
+                    yield Token(type, value, line, column + pos - start)
+            else:
+                for type, value, pos in tokens:
+                    yield Token(type, value, *position(pos))
+
+            pos = end
+
+        if(pos):
+            # count the lines in what has been scanned, then drop it
+            position(pos)
+
+            buffer = buffer[pos:]
+            offset += pos
+
+    yield Token("EOF", "EOF", line, 0)
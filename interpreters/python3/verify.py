@@ -0,0 +1,125 @@
+from typing import Union
+
+from constants import ARG_NUM, ARG_TYPES, SKIP, Types
+from errors import ArgumentNumberError, InvalidArgumentTypeError, InvalidPointerError, SkipCommandError, UknownTypeError, VerificationError
+
+__all__ = ["verify"]
+
+# only the name of a function is checked here. the parameters of a function can be anything, and what the arguments
+# of a call have to be depends on the function being called, which is only known when it runs
+FUNCTION_COMMANDS = ["/", "\\", "|"]
+
+# the arguments of each command that are pointers, they are checked by `get_jump_target`
+POINTERS = {
+    "#": [0],
+    "?": [1, 2],
+}
+
+# everything that can be wrong with a command without running it
+PROBLEMS = (ArgumentNumberError, InvalidArgumentTypeError, InvalidPointerError, UknownTypeError)
+
+
+def check_arguments(command) -> None:
+    # raises if `command` could never run. in non-strict mode that raises `SkipCommandError` instead
+    arg_num = ARG_NUM[command.name]
+    curr_num = len(command.arguments)
+
+    if(curr_num < arg_num[0] or (arg_num[1] is not None and curr_num > arg_num[1])):
+        raise ArgumentNumberError(command.name, arg_num, curr_num)
+
+    if(command.name in FUNCTION_COMMANDS):
+        if(curr_num > 0 and command.arguments[0].type != Types.VARIABLE):
+            raise InvalidArgumentTypeError(command.name, 1, Types.VARIABLE, command.arguments[0].type)
+
+        return
+
+    pointers = POINTERS.get(command.name, [])
+
+    for num, (arg, types) in enumerate(zip(command.arguments, ARG_TYPES[command.name])):
+        if(num in pointers):
+            continue
+
+        if(arg.type == Types.VARIABLE):
+            # the type of a variable is only known when the command runs. the only exception is the type of a
+            # declaration, where a name instead of a keyword can never be a type
+            if(command.name == "$" and num == 1):
+                raise UknownTypeError(arg.value)
+
+            continue
+
+        if(not Types.eq(arg.type, types)):
+            raise InvalidArgumentTypeError(command.name, num + 1, types, arg.type)
+
+
+def get_jump_target(command, num: int, index: int, length: int) -> Union[int, None]:
+    # `index` is the position of the command in its function, `length` is the number of commands in the function.
+    # returns `None` if the pointer is invalid (non-strict) or if there is no pointer
+    if(num >= len(command.arguments)):
+        return None
+
+    arg = command.arguments[num]
+
+    try:
+        # pointers are always literals, a variable could be anything
+        if(arg.type != Types.LT_NUMBER):
+            raise InvalidArgumentTypeError(command.name, num + 1, Types.LT_NUMBER, arg.type)
+
+        sign = arg.sign
+
+        # relative pointers are relative to the command itself. absolute pointers have always gone to the command
+        # before the one they name
+        if(sign == ""):
+            target = arg.value - 1
+        else:
+            target = index + arg.value
+
+        # jumping to `length` is allowed, it just ends the function
+        if(target != int(target) or target < 0 or target > length):
+            raise InvalidPointerError(command.name, sign.replace("-", "") + str(arg.value))
+
+        return int(target)
+
+    except SkipCommandError:
+        return None
+
+
+def verify(commands: dict) -> None:
+    # checks the number of arguments and the type of every literal once, when the program is loaded, so running a
+    # command only has to check what can change while it runs (whether its variables exist and what type they are).
+    # pointers are checked here too, and the absolute index each one goes to is stored in `Command.targets`.
+    # in non-strict mode commands that would always be skipped are lowered to `SKIP`. in strict mode every problem in
+    # the program is reported at once, before any of it runs
+    problems = []
+
+    for scope_commands in commands.values():
+        for index, command in enumerate(scope_commands):
+            try:
+                check_arguments(command)
+            except SkipCommandError:
+                command.op = SKIP
+                continue
+            except PROBLEMS as e:
+                problems.append((command.line, command.column, e.message))
+                continue
+
+            if(command.name not in POINTERS):
+                continue
+
+            command.targets = []
+
+            for num in POINTERS[command.name]:
+                try:
+                    command.targets.append(get_jump_target(command, num, index, len(scope_commands)))
+                except PROBLEMS as e:
+                    problems.append((command.line, command.column, e.message))
+                    command.targets.append(None)
+
+            # a goto that goes nowhere is the same as no goto
+            if(command.name == "#" and command.targets[0] is None):
+                command.op = SKIP
+
+    if(len(problems) > 0):
+        # functions are stored apart from the code around them, so put the problems back in the order of the file
+        problems.sort()
+
+        raise VerificationError(problems)